@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+#
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+from settings import *
+from cache import make_key
+from charset import charset_spec, parse_charset
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# One conversion of the batch matrix.
+#
+#   fname: source font file, otf or ttf
+#   ftype: either 'horizontal' or 'vertical'
+#   psize: font size in pixel unit
+#   chars: character set specification, see charset.parse_charset()
+#   suffix: output name suffix, set when several character sets are requested
+#
+Job = namedtuple('Job', 'fname ftype psize chars suffix')
+
+#
+# Outcome of a job.
+#
+#   output: generated file path or None on failure
+#   elapsed: wall-clock time of the job in seconds
+#   error: failure description or None
+#   metrics: stage timings and counters, see metrics.Metrics.as_dict()
+#
+Result = namedtuple('Result', 'job output elapsed error metrics')
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Build the job list for every combination of font, size, type and
+# character set.
+#
+# Outputs of several character sets are told apart by the first and the last
+# code, plus a short hash of the whole set when sets share both, so that no
+# job overwrites the files of another. Sets of the same codes are converted
+# once.
+#
+def build_jobs(fonts, sizes, ftypes, charsets):
+    sets = {}
+    for chars in charsets:
+        sets.setdefault(parse_charset(chars), chars)
+    charsets = list(sets.values())
+
+    suffixes = {}
+    for codes, chars in sets.items():
+        if len(charsets) > 1:
+            suffixes[chars] = '_{:02X}_{:02X}'.format(codes[0], codes[-1])
+        else:
+            suffixes[chars] = ''
+    taken = list(suffixes.values())
+    for codes, chars in sets.items():
+        if taken.count(suffixes[chars]) > 1:
+            suffixes[chars] += '_' + make_key(charset_spec(codes))[:6]
+
+    jobs = []
+    for fname in fonts:
+        for psize in sizes:
+            for ftype in ftypes:
+                for chars in charsets:
+                    jobs.append(Job(fname, ftype, psize, chars,
+                            suffixes[chars]))
+    return jobs
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Run one job. Executed in a worker process.
+#
+def run_job(job,
+        outdir = DEFAULT_OUTPUT_DIR,
+        backend = DEFAULT_RASTERIZER,
+        oformat = DEFAULT_OUTPUT_FORMAT,
+        compact = False,
+        rle = False,
+        colors = None,
+        split = DEFAULT_SPLIT,
+        memory_limit = DEFAULT_MEMORY_LIMIT,
+        use_cache = USE_CACHE,
+        trace_memory = False,
+        profile = False):
+    # imported here to keep the worker start-up light
+    from fontgen import generate_font_file
+    from metrics import Metrics
+
+    metrics = Metrics(trace_memory, profile)
+    metrics.start()
+    start = time.time()
+    try:
+        output = generate_font_file(job.fname,
+                ftype = job.ftype,
+                psize = job.psize,
+                chars = job.chars,
+                outdir = outdir,
+                suffix = job.suffix,
+                backend = backend,
+                oformat = oformat,
+                compact = compact,
+                rle = rle,
+                colors = colors,
+                split = split,
+                memory_limit = memory_limit,
+                use_cache = use_cache,
+                metrics = metrics)
+        error = None if output else 'conversion failed'
+    except Exception as e:
+        output = None
+        error = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        metrics.stop()
+
+    return Result(job, output or None, time.time() - start, error,
+            metrics.as_dict())
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Run jobs across a process pool.
+#
+#   jobs: list of Job
+#   workers: number of processes, 0 or None for one per CPU
+#   outdir: output directory
+#   backend: rasterizer backend name
+#   oformat: output file format
+#   compact: crop glyphs to their ink
+#   rle: run-length encode the cropped glyphs
+#   colors: (fg, bg) RGB565 colors of the rgb565 layout
+#   split: glyphs per C array
+#   memory_limit: memory ceiling of each job in bytes
+#   use_cache: use the conversion cache
+#   trace_memory: record the peak memory of every stage, see metrics.py
+#   profile: profile every job with cProfile
+#
+# Returns the list of Result in job order.
+#
+def run_batch(jobs, workers = DEFAULT_JOBS, outdir = DEFAULT_OUTPUT_DIR,
+        backend = DEFAULT_RASTERIZER, oformat = DEFAULT_OUTPUT_FORMAT,
+        compact = False, rle = False, colors = None,
+        split = DEFAULT_SPLIT, memory_limit = DEFAULT_MEMORY_LIMIT,
+        use_cache = USE_CACHE, trace_memory = False, profile = False):
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(jobs)
+
+    # a single worker does not need a pool
+    if workers == 1 or len(jobs) <= 1:
+        for idx, job in enumerate(jobs):
+            results[idx] = run_job(job, outdir, backend, oformat,
+                    compact, rle, colors, split, memory_limit, use_cache,
+                    trace_memory, profile)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job, outdir, backend, oformat,
+                compact, rle, colors, split, memory_limit, use_cache,
+                trace_memory, profile): idx
+                for idx, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                # the worker process itself died
+                results[idx] = Result(jobs[idx], None, 0.0,
+                        '{}: {}'.format(type(e).__name__, e), None)
+
+    return results
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Print timings and failures of a batch run.
+#
+def print_summary(results, elapsed):
+    failed = [r for r in results if r.error]
+
+    print('')
+    for r in results:
+        job = r.job
+        print('> {:5s} {:7.3f}s {} {} {}pt {} {}'.format(
+                'FAIL' if r.error else 'OK', r.elapsed,
+                os.path.basename(job.fname), job.ftype, job.psize,
+                job.chars, r.error or r.output))
+
+    print('')
+    print('> {} jobs, {} succeeded, {} failed'.format(
+            len(results), len(results) - len(failed), len(failed)))
+    print('> wall time {:.3f}s, job time {:.3f}s'.format(
+            elapsed, sum(r.elapsed for r in results)))
+    print('')
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+#
+from array import array
+
+# BDF versions accepted by the parser
+SUPPORTED_VERSIONS = ('2.1',)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Raised when a BDF stream is malformed or of an unsupported version.
+#
+class BdfError(ValueError):
+    pass
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Light-weight view of one glyph in a BdfFont.
+#
+# Glyphs are not stored as objects. The font keeps every glyph field in
+# parallel arrays and a view is only created when a glyph is indexed.
+#
+#   encoding: character code of the glyph
+#   dwidth: horizontal device width in pixel
+#   bbx: glyph bounding box (bbw, bbh, bbxoff, bbyoff)
+#   stride: number of bytes of each bitmap row, (bbw + 7) // 8
+#   bitmap: raw bitmap bytes, bbh rows of stride bytes, MSB first
+#   rows: bitmap rows as integers, as they appear in the BDF hex lines
+#
+class Glyph(object):
+    __slots__ = ('font', 'index')
+
+    def __init__(self, font, index):
+        self.font = font
+        self.index = index
+
+    @property
+    def encoding(self):
+        return self.font.encoding[self.index]
+
+    @property
+    def dwidth(self):
+        return self.font.dwidth[self.index]
+
+    @property
+    def bbx(self):
+        i = self.index * 4
+        return tuple(self.font.bbx[i:i+4])
+
+    @property
+    def stride(self):
+        return (self.font.bbx[self.index * 4] + 7) // 8
+
+    @property
+    def bitmap(self):
+        return bytes(self.font.data[self.font.offset[self.index]:
+                self.font.offset[self.index + 1]])
+
+    @property
+    def rows(self):
+        stride = self.stride
+        bitmap = self.bitmap
+        return [int.from_bytes(bitmap[i:i+stride], 'big')
+                for i in range(0, len(bitmap), stride)]
+
+    def __repr__(self):
+        return 'Glyph(encoding={}, dwidth={}, bbx={})'.format(
+                self.encoding, self.dwidth, self.bbx)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# In-memory BDF font.
+#
+#   version: BDF format version string
+#   size: (point size, x resolution, y resolution) of the SIZE keyword
+#   fbbx, fbby, xoff, yoff: font bounding box
+#   properties: every property between STARTPROPERTIES and ENDPROPERTIES
+#       with string values unquoted and numeric values converted to int
+#
+# Glyph data is kept in flat arrays so that a font with tens of thousands of
+# glyphs needs only a handful of Python objects:
+#
+#   encoding, dwidth: one entry per glyph
+#   bbx: four entries per glyph
+#   offset: start of each glyph bitmap in data, plus a trailing sentinel
+#   data: every glyph bitmap back to back
+#
+class BdfFont(object):
+    __slots__ = ('version', 'size', 'fbbx', 'fbby', 'xoff', 'yoff',
+            'properties', 'encoding', 'dwidth', 'bbx', 'offset', 'data')
+
+    def __init__(self):
+        self.version = None
+        self.size = (0, 0, 0)
+        self.fbbx = self.fbby = self.xoff = self.yoff = 0
+        self.properties = {}
+        self.encoding = array('l')
+        self.dwidth = array('l')
+        self.bbx = array('l')
+        self.offset = array('L', [0])
+        self.data = bytearray()
+
+    def __len__(self):
+        return len(self.encoding)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('glyph index out of range')
+        return Glyph(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Glyph(self, index)
+
+    @property
+    def point_size(self):
+        return self.size[0]
+
+    # new font holding only the glyphs whose encoding is in codes, sorted by
+    # encoding
+    def subset(self, codes):
+        codes = frozenset(codes)
+        font = BdfFont()
+        font.version = self.version
+        font.size = self.size
+        font.fbbx, font.fbby = self.fbbx, self.fbby
+        font.xoff, font.yoff = self.xoff, self.yoff
+        font.properties = dict(self.properties)
+        order = sorted(range(len(self)), key=self.encoding.__getitem__)
+        for index in order:
+            g = Glyph(self, index)
+            if g.encoding in codes:
+                font.add_glyph(g.encoding, g.dwidth, g.bbx, g.bitmap)
+        return font
+
+    # append a glyph; bitmap must hold bbh rows of (bbw + 7) // 8 bytes
+    def add_glyph(self, encoding, dwidth, bbx, bitmap):
+        self.encoding.append(encoding)
+        self.dwidth.append(dwidth)
+        self.bbx.extend(bbx)
+        self.data.extend(bitmap)
+        self.offset.append(len(self.data))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Convert a property value into int or unquoted string.
+#
+def _property_value(value):
+    if value.startswith('"'):
+        return value[1:-1].replace('""', '"') if value.endswith('"') \
+                else value[1:]
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Parse BDF data in a single pass.
+#
+#   lines: iterable of text or bytes lines, e.g. an open file or a pipe
+#
+# Each line is split into keyword and arguments once. Returns a BdfFont and
+# raises BdfError for malformed or unsupported input.
+#
+def parse_bdf(lines):
+    font = BdfFont()
+
+    # parser states
+    in_props = False
+    in_char = False
+    in_bitmap = False
+
+    encoding = -1
+    dwidth = 0
+    bbx = (0, 0, 0, 0)
+    stride = 0
+    bitmap = bytearray()
+
+    for lineno, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('latin-1')
+
+        # bitmap rows are by far the most frequent lines
+        if in_bitmap:
+            line = line.strip()
+            if line != 'ENDCHAR':
+                try:
+                    row = bytes.fromhex(line)
+                except ValueError:
+                    raise BdfError('line {}: bad bitmap row'.format(lineno))
+                # normalize row padding to the glyph stride
+                if len(row) >= stride:
+                    bitmap += row[:stride]
+                else:
+                    bitmap += row
+                    bitmap += bytes(stride - len(row))
+                continue
+            font.add_glyph(encoding, dwidth, bbx, bitmap)
+            in_bitmap = in_char = False
+            continue
+
+        keyword, _, args = line.strip().partition(' ')
+        args = args.strip()
+
+        try:
+            if in_props:
+                if keyword == 'ENDPROPERTIES':
+                    in_props = False
+                elif keyword:
+                    font.properties[keyword] = _property_value(args)
+
+            elif in_char:
+                if keyword == 'ENCODING':
+                    encoding = int(args.split()[0])
+                elif keyword == 'DWIDTH':
+                    dwidth = int(args.split()[0])
+                elif keyword == 'BBX':
+                    bbx = tuple(int(x) for x in args.split()[:4])
+                    if len(bbx) != 4:
+                        raise ValueError
+                elif keyword == 'BITMAP':
+                    stride = (bbx[0] + 7) // 8
+                    bitmap = bytearray()
+                    in_bitmap = True
+                elif keyword == 'ENDCHAR':
+                    # glyph without BITMAP section
+                    font.add_glyph(encoding, dwidth, bbx,
+                            bytes(((bbx[0] + 7) // 8) * bbx[1]))
+                    in_char = False
+
+            elif keyword == 'STARTCHAR':
+                in_char = True
+                encoding = -1
+                dwidth = 0
+                bbx = (0, 0, 0, 0)
+
+            elif keyword == 'STARTFONT':
+                font.version = args
+                if args not in SUPPORTED_VERSIONS:
+                    raise BdfError('unsupported BDF version ' + args)
+
+            elif font.version is None:
+                if keyword and keyword != 'COMMENT':
+                    raise BdfError('missing STARTFONT')
+
+            elif keyword == 'SIZE':
+                font.size = tuple(int(x) for x in args.split()[:3])
+
+            elif keyword == 'FONTBOUNDINGBOX':
+                font.fbbx, font.fbby, font.xoff, font.yoff = \
+                        [int(x) for x in args.split()[:4]]
+
+            elif keyword == 'STARTPROPERTIES':
+                in_props = True
+
+        except (ValueError, IndexError) as e:
+            if isinstance(e, BdfError):
+                raise
+            raise BdfError('line {}: bad {} line'.format(lineno, keyword))
+
+    if font.version is None:
+        raise BdfError('missing STARTFONT')
+    if in_char or in_props:
+        raise BdfError('unexpected end of BDF data')
+
+    return font
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Parse a BDF file.
+#
+def read_bdf(fname):
+    with open(fname, 'rb') as f:
+        return parse_bdf(f)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
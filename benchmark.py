@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+#
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from bdf import parse_bdf
+from bitmap import glyph_matrix, glyph_widths, pack_horizontal, pack_vertical
+from charset import charset_spec
+from emit import format_glyph_lines, write_if_changed
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Benchmark of the conversion stages on synthetic BDF fonts.
+#
+# No font file and no otf2bdf are needed: every case is a generated BDF font
+# that goes through the stages of generate_font_file one by one,
+#
+#   parse: parse_bdf() of the BDF text
+#   matrix: glyph_matrix(), the bit matrix shared by all layouts
+#   horizontal: pack_horizontal()
+#   vertical: pack_vertical(), the rotation
+#   write: C text of the horizontal glyph array written to a file
+#   total: generate_font_file() with the bdf backend and no cache
+#
+# and the best time of several runs, the throughput and the peak memory of
+# every stage are reported. Results can be saved as a JSON baseline and later
+# runs compared against it.
+#
+#   ./benchmark.py --save baseline.json
+#   ./benchmark.py --compare baseline.json --threshold 0.25
+#
+
+# name: (number of glyphs, first code, width, height)
+CASES = {
+    'ascii-8': (95, 0x20, 6, 8),
+    'ascii-16': (95, 0x20, 12, 16),
+    'latin-32': (224, 0x20, 24, 32),
+    'wide-48': (95, 0x20, 48, 48),
+    'wide-96': (95, 0x20, 96, 96),
+    'cjk-16': (20992, 0x4e00, 16, 16),
+    'cjk-24': (20992, 0x4e00, 24, 24),
+}
+QUICK_CASES = ('ascii-8', 'ascii-16', 'latin-32', 'wide-48')
+
+STAGES = ('parse', 'matrix', 'horizontal', 'vertical', 'write', 'total')
+
+# regressions smaller than these are timer and allocator noise of the short
+# stages, whatever the relative increase
+MIN_DELTA_SECONDS = 0.002
+MIN_DELTA_BYTES = 64 * 1024
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Synthetic BDF font as text.
+#
+#   count: number of glyphs
+#   first: character code of the first glyph
+#   width, height: font bounding box in pixels
+#   seed: seed of the glyph shapes, the same seed gives the same font
+#
+# Glyphs get random boxes inside the font bounding box and random bitmaps
+# with about half of the pixels set.
+#
+def make_bdf(count, first, width, height, seed = 1):
+    rnd = random.Random(seed)
+    xoff, yoff = 0, -(height // 4)
+    out = ['STARTFONT 2.1',
+            'FONT -Bench-Synthetic-Medium-R-Normal--{0}-{0}0-72-72-P-{1}0-'
+            'ISO10646-1'.format(height, width),
+            'SIZE {} 72 72'.format(height),
+            'FONTBOUNDINGBOX {} {} {} {}'.format(width, height, xoff, yoff),
+            'STARTPROPERTIES 7',
+            'FAMILY_NAME "Bench {}x{}"'.format(width, height),
+            'WEIGHT_NAME "Medium"',
+            'SLANT "R"',
+            'SETWIDTH_NAME "Normal"',
+            'ADD_STYLE_NAME ""',
+            'PIXEL_SIZE {}'.format(height),
+            'SPACING "P"',
+            'ENDPROPERTIES',
+            'CHARS {}'.format(count)]
+    for code in range(first, first + count):
+        bbw = rnd.randint(max(1, width // 2), width)
+        bbh = rnd.randint(max(1, height // 2), height)
+        bbx = xoff + rnd.randint(0, width - bbw)
+        bby = yoff + rnd.randint(0, height - bbh)
+        stride = (bbw + 7) // 8
+        out.extend(['STARTCHAR u{:04X}'.format(code),
+                'ENCODING {}'.format(code),
+                'SWIDTH 500 0',
+                'DWIDTH {} 0'.format(bbx - xoff + bbw + rnd.randint(0, 2)),
+                'BBX {} {} {} {}'.format(bbw, bbh, bbx, bby),
+                'BITMAP'])
+        fmt = '{:0' + str(stride * 2) + 'X}'
+        for row in range(bbh):
+            out.append(fmt.format(rnd.getrandbits(bbw) << (stride * 8 - bbw)))
+        out.append('ENDCHAR')
+    out.append('ENDFONT')
+    return '\n'.join(out) + '\n'
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Best wall time of a function over several runs, and its peak memory in a
+# separate run under tracemalloc, which numpy reports its buffers to.
+#
+def measure(func, repeat):
+    best = None
+    for n in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+#
+# Run every stage of one case.
+#
+#   name: case name in CASES
+#   workdir: directory for the BDF file and the outputs
+#   repeat: number of timed runs of each stage
+#
+# Returns {stage: {'seconds', 'glyphs_per_s', 'bytes_per_s', 'peak_bytes'}}
+# where the bytes are the input of the parse stage and the output of the
+# others.
+#
+def run_case(name, workdir, repeat = 3):
+    # imported here since fontgen is usually the main module
+    from fontgen import generate_font_file
+
+    count, first, width, height = CASES[name]
+    text = make_bdf(count, first, width, height)
+    lines = text.splitlines(True)
+    bdfname = os.path.join(workdir, name + '.bdf')
+    with open(bdfname, 'w') as f:
+        f.write(text)
+
+    # inputs of the later stages, computed once
+    font = parse_bdf(lines)
+    matrix = glyph_matrix(font)
+    widths = glyph_widths(font)
+    hdata = pack_horizontal(matrix, widths)
+    vdata = pack_vertical(matrix, widths, font.fbbx)
+    codes = list(font.encoding)
+    chars = charset_spec(codes)
+    outname = os.path.join(workdir, name + '.h')
+    outdir = os.path.join(workdir, name)
+
+    def write():
+        if os.path.exists(outname):
+            os.remove(outname)
+        write_if_changed(outname, format_glyph_lines(hdata, codes))
+
+    def total():
+        shutil.rmtree(outdir, ignore_errors=True)
+        generate_font_file(bdfname, ftype = 'horizontal', psize = height,
+                chars = chars, outdir = outdir, backend = 'bdf',
+                use_cache = False)
+
+    stages = {
+        'parse': (lambda: parse_bdf(lines), len(text)),
+        'matrix': (lambda: glyph_matrix(font), matrix.nbytes),
+        'horizontal': (lambda: pack_horizontal(matrix, widths), hdata.nbytes),
+        'vertical': (lambda: pack_vertical(matrix, widths, font.fbbx),
+                vdata.nbytes),
+        'write': (write, None),
+        'total': (total, None),
+    }
+
+    results = {}
+    for stage in STAGES:
+        func, nbytes = stages[stage]
+        seconds, peak = measure(func, repeat)
+        if nbytes is None:
+            # output file size
+            nbytes = os.path.getsize(outname) if stage == 'write' else \
+                    sum(os.path.getsize(os.path.join(outdir, x))
+                    for x in os.listdir(outdir))
+        seconds = max(seconds, 1e-9)
+        results[stage] = {
+            'seconds': seconds,
+            'glyphs_per_s': count / seconds,
+            'bytes_per_s': nbytes / seconds,
+            'peak_bytes': peak,
+        }
+    return results
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Stages of a run that regressed against a baseline.
+#
+#   current, baseline: results as saved by the benchmark
+#   threshold: allowed relative increase of the time and the peak memory
+#   min_seconds, min_bytes: smallest absolute increase that counts
+#
+# Cases and stages missing from either side are skipped. Returns a list of
+# (case, stage, what, baseline value, current value).
+#
+def compare(current, baseline, threshold,
+        min_seconds = MIN_DELTA_SECONDS,
+        min_bytes = MIN_DELTA_BYTES):
+    floor = {'seconds': min_seconds, 'peak_bytes': min_bytes}
+    regressions = []
+    for name, stages in sorted(current['cases'].items()):
+        base_stages = baseline['cases'].get(name, {})
+        for stage in STAGES:
+            cur, base = stages.get(stage), base_stages.get(stage)
+            if cur is None or base is None:
+                continue
+            for what in ('seconds', 'peak_bytes'):
+                if cur[what] > base[what] * (1 + threshold) \
+                        and cur[what] - base[what] >= floor[what]:
+                    regressions.append((name, stage, what, base[what],
+                            cur[what]))
+    return regressions
+
+#
+# Print the results as a table.
+#
+def print_results(results):
+    print('')
+    print('> {:<10} {:<11} {:>10} {:>12} {:>10} {:>10}'.format('case',
+            'stage', 'ms', 'glyphs/s', 'MB/s', 'peak MB'))
+    for name, stages in results['cases'].items():
+        for stage in STAGES:
+            r = stages[stage]
+            print('> {:<10} {:<11} {:>10.2f} {:>12.0f} {:>10.1f} {:>10.1f}'
+                    .format(name, stage, r['seconds'] * 1000,
+                    r['glyphs_per_s'], r['bytes_per_s'] / 1e6,
+                    r['peak_bytes'] / 1e6))
+    print('')
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description='Benchmark the conversion stages on synthetic fonts.')
+    parser.add_argument('cases', nargs='*',
+            help='cases to run, default: all, see CASES: '
+            + ', '.join(CASES))
+    parser.add_argument('--quick', action='store_true',
+            help='run the small cases only: ' + ', '.join(QUICK_CASES))
+    parser.add_argument('-n', '--repeat', type=int, default=3,
+            help='timed runs of each stage, the best one counts')
+    parser.add_argument('--save', metavar='FILE',
+            help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+            help='fail when a stage is slower or uses more memory than in '
+            'this baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+            help='allowed relative regression, default: 0.25')
+    parser.add_argument('--min-delta', type=float,
+            default=MIN_DELTA_SECONDS * 1000, metavar='MS',
+            help='ignore slowdowns of less than MS milliseconds, default: '
+            '{:g}'.format(MIN_DELTA_SECONDS * 1000))
+    args = parser.parse_args()
+
+    names = args.cases or (QUICK_CASES if args.quick else list(CASES))
+    for name in names:
+        if name not in CASES:
+            parser.error('unknown case: {}'.format(name))
+
+    results = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'repeat': args.repeat,
+        'cases': {},
+    }
+    workdir = tempfile.mkdtemp(prefix='fontgen-bench-')
+    try:
+        for name in names:
+            results['cases'][name] = run_case(name, workdir, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('> results saved to', args.save)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold,
+                args.min_delta / 1000)
+        for name, stage, what, base, cur in regressions:
+            print('> REGRESSION {} {} {}: {:.4g} -> {:.4g} ({:+.0f}%)'.format(
+                    name, stage, what, base, cur, 100.0 * (cur - base) / base))
+        if regressions:
+            sys.exit(1)
+        print('> no regression beyond {:.0f}%'.format(args.threshold * 100))
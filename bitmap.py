@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+#
+import numpy as np
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Glyph placement inside the font bounding box.
+#
+#   font: BdfFont
+#
+# Returns (px_v, px_h, bbw, bbh) arrays with one entry per glyph, where px_v is
+# the x margin in pixel from the leftmost position and px_h is the y margin in
+# pixel from the topmost position.
+#
+def glyph_offsets(font):
+    bbx = np.array(font.bbx, dtype=np.int64).reshape(-1, 4)
+    bbw, bbh = bbx[:,0], bbx[:,1]
+    px_v = bbx[:,2] - font.xoff
+    px_h = font.fbby + font.yoff - bbx[:,3] - bbh
+    return px_v, px_h, bbw, bbh
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Actual glyph width in pixel, stored as the leading byte of each glyph.
+#
+def glyph_widths(font):
+    px_v, px_h, bbw, bbh = glyph_offsets(font)
+    dwidth = np.array(font.dwidth, dtype=np.int64)
+    return np.minimum(np.maximum(dwidth, px_v + bbw), 255).astype(np.uint8)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Render the glyphs of a font into one bit matrix.
+#
+#   font: BdfFont
+#   start, stop: range of glyphs to render, all of them by default
+#
+# Returns uint8 array of shape (glyphs, fbby, widthbytes * 8) holding 0 or 1.
+# Each glyph is placed in the font bounding box with the same margins as the
+# BDF offsets describe. Glyphs of any width are supported.
+#
+# All bitmaps are unpacked at once and only the set bits are scattered into
+# the matrix, so there is no Python-level work per glyph or per row. Large
+# fonts are rendered in chunks of glyphs, see chunk_size().
+#
+def glyph_matrix(font, start = 0, stop = None):
+    if stop is None:
+        stop = len(font)
+    n = stop - start
+    height = font.fbby
+    width = ((font.fbbx + 7) // 8) * 8
+    matrix = np.zeros((n, height, width), dtype=np.uint8)
+    if n <= 0 or len(font.data) == 0:
+        return matrix
+
+    # 32 bit indices are plenty for a chunk and halve the memory of the
+    # per-bit arrays below
+    px_v, px_h, bbw, bbh = [a[start:stop].astype(np.int32)
+            for a in glyph_offsets(font)]
+    stride = (bbw + 7) // 8
+    offset = np.array(font.offset[start:stop], dtype=np.int64)
+    data = font.data[offset[0]:font.offset[stop]]
+    offset = (offset - offset[0]).astype(np.int32)
+
+    # position of every set bit in the concatenated bitmap data
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    pos = np.flatnonzero(bits).astype(np.int32)
+    del bits
+    byte = pos >> 3
+
+    # owner glyph, then row and column inside the glyph bounding box
+    g = (np.searchsorted(offset, byte, side='right') - 1).astype(np.int32)
+    local = byte - offset[g]
+    del byte
+    width_g = stride[g]
+    row = local // width_g
+    col = (local - row * width_g) * 8 + (pos & 7)
+    del local, width_g, pos
+
+    # move into the font bounding box and drop anything outside of it
+    y = px_h[g] + row
+    del row
+    x = px_v[g] + col
+    keep = (col < bbw[g]) & (y >= 0) & (y < height) & (x >= 0) & (x < width)
+    del col
+    matrix[g[keep], y[keep], x[keep]] = 1
+
+    return matrix
+
+#
+# Number of glyphs to render at once so that glyph_matrix() and the packers
+# stay within a memory ceiling.
+#
+#   font: BdfFont
+#   limit: memory ceiling in bytes
+#
+# The estimate allows 24 bytes per matrix cell, which covers the matrix, the
+# unpacked bits and the index arrays of glyphs with up to about half of their
+# pixels set, as well as the copies the packers make.
+#
+def chunk_size(font, limit):
+    cells = max(font.fbby * ((font.fbbx + 7) // 8) * 8, 1)
+    return max(1, int(limit // (24 * cells)))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Horizontal format glyph data.
+#
+#   matrix: glyph bit matrix from glyph_matrix()
+#   widths: glyph widths from glyph_widths()
+#   msb_first: the leftmost pixel is the MSB, otherwise the LSB
+#
+# Returns uint8 array of shape (glyphs, 1 + height * widthbytes). Each entry is
+# the glyph width followed by the glyph lines.
+#
+def pack_horizontal(matrix, widths, msb_first = True):
+    n = matrix.shape[0]
+    data = np.packbits(matrix, axis=2,
+            bitorder='big' if msb_first else 'little').reshape(n, -1)
+    return np.hstack((widths.reshape(n, 1), data))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# SED1520 compatible vertical format glyph data.
+#
+#   matrix: glyph bit matrix from glyph_matrix()
+#   widths: glyph widths from glyph_widths()
+#   width: number of columns to emit, usually the font bounding box width
+#
+# Returns uint8 array of shape (glyphs, 1 + width * heightbytes). Each entry is
+# the glyph width followed by the glyph columns, each column heightbytes long
+# with the LSB being the topmost pixel of the page. The glyph is aligned to
+# the bottom of the pages, so any blank rows are at the top.
+#
+# The whole font is rotated at once by padding, transposing and packing the
+# bit matrix, so any number of pages is supported.
+#
+def pack_vertical(matrix, widths, width):
+    n, height = matrix.shape[:2]
+    heightbytes = (height + 7) // 8
+    pad = heightbytes * 8 - height
+    cols = np.pad(matrix[:, :, :width], ((0, 0), (pad, 0), (0, 0)))
+    cols = cols.transpose(0, 2, 1)
+    data = np.packbits(cols, axis=2, bitorder='little').reshape(n, -1)
+    return np.hstack((widths.reshape(n, 1), data))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Page-major format glyph data of SSD1306, SH1106 and ST7565 type controllers.
+#
+#   matrix: glyph bit matrix from glyph_matrix()
+#   widths: glyph widths from glyph_widths()
+#   width: number of columns to emit, usually the font bounding box width
+#   msb_first: the topmost pixel of a page is the MSB, otherwise the LSB
+#
+# Returns uint8 array of shape (glyphs, 1 + pages * width). Each entry is the
+# glyph width followed by the pages, each page being one byte per column for
+# 8 rows, which is the order these controllers take in horizontal addressing
+# mode. As in pack_vertical() the glyph is aligned to the bottom of the pages.
+#
+def pack_pages(matrix, widths, width, msb_first = False):
+    n, height = matrix.shape[:2]
+    pages = (height + 7) // 8
+    pad = pages * 8 - height
+    cells = np.pad(matrix[:, :, :width], ((0, 0), (pad, 0), (0, 0)))
+    cells = cells.reshape(n, pages, 8, width).transpose(0, 1, 3, 2)
+    data = np.packbits(cells, axis=3,
+            bitorder='big' if msb_first else 'little').reshape(n, -1)
+    return np.hstack((widths.reshape(n, 1), data))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# RGB565 glyph data pre-expanded to two colors for color TFT controllers.
+#
+#   matrix: glyph bit matrix from glyph_matrix()
+#   widths: glyph widths from glyph_widths()
+#   width: number of columns to emit, usually the font bounding box width
+#   fg, bg: RGB565 colors of set and blank pixels
+#   big_endian: byte order of the pixels, big-endian as SPI controllers such
+#       as ILI9341 and ST7789 take them
+#
+# Returns uint8 array of shape (glyphs, 1 + height * width * 2). Each entry is
+# the glyph width followed by the pixels row by row.
+#
+def pack_rgb565(matrix, widths, width, fg, bg, big_endian = True):
+    n = matrix.shape[0]
+    colors = np.array([bg, fg], dtype='>u2' if big_endian else '<u2')
+    data = colors[matrix[:, :, :width]].view(np.uint8).reshape(n, -1)
+    return np.hstack((widths.reshape(n, 1), data))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Compact glyph data cropped to the ink of every glyph.
+#
+#   matrix: glyph bit matrix from glyph_matrix()
+#   widths: glyph widths from glyph_widths()
+#   vertical: emit SED1520 style columns instead of horizontal lines
+#
+# Returns (metrics, bitmaps). metrics is a uint8 array of shape (glyphs, 5)
+# holding width, height, xoffset, yoffset and advance of every glyph, where
+# the offsets locate the cropped bitmap in the font bounding box from its top
+# left corner. bitmaps is a list with the bytes of every cropped glyph, either
+# height lines of (width + 7) // 8 bytes, MSB leftmost, or width columns of
+# (height + 7) // 8 bytes, LSB topmost. Blank glyphs have no bitmap bytes.
+#
+def pack_compact(matrix, widths, vertical = False):
+    n, height, width = matrix.shape
+
+    # ink bounding box of every glyph at once
+    rows = matrix.any(axis=2)
+    cols = matrix.any(axis=1)
+    inked = rows.any(axis=1)
+    top = np.argmax(rows, axis=1)
+    bottom = height - np.argmax(rows[:, ::-1], axis=1)
+    left = np.argmax(cols, axis=1)
+    right = width - np.argmax(cols[:, ::-1], axis=1)
+
+    metrics = np.zeros((n, 5), dtype=np.uint8)
+    metrics[:,0] = np.where(inked, right - left, 0)
+    metrics[:,1] = np.where(inked, bottom - top, 0)
+    metrics[:,2] = np.where(inked, left, 0)
+    metrics[:,3] = np.where(inked, top, 0)
+    metrics[:,4] = widths
+
+    bitmaps = []
+    for idx in range(n):
+        if not inked[idx]:
+            bitmaps.append(b'')
+            continue
+        ink = matrix[idx, top[idx]:bottom[idx], left[idx]:right[idx]]
+        if vertical:
+            data = np.packbits(ink.T, axis=1, bitorder='little')
+        else:
+            data = np.packbits(ink, axis=1)
+        bitmaps.append(data.tobytes())
+
+    return metrics, bitmaps
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Unpackers are the inverse of the packers above, for tools that draw with
+# generated glyph data.
+#
+#   data: uint8 array of shape (glyphs, 1 + glyph bytes) as returned by the
+#       packers, the glyph width followed by the glyph data
+#
+# Each returns (widths, matrix) where matrix is a uint8 array of shape
+# (glyphs, rows, columns) holding 0 or 1. Vertical and page data unpack to
+# whole pages, so blank rows from the bottom alignment are at the top.
+#
+
+#
+# Horizontal format, see pack_horizontal().
+#
+#   height: number of lines of every glyph
+#
+def unpack_horizontal(data, height, msb_first = True):
+    n = data.shape[0]
+    lines = data[:, 1:].reshape(n, height, -1)
+    matrix = np.unpackbits(lines, axis=2,
+            bitorder='big' if msb_first else 'little')
+    return data[:, 0].copy(), matrix
+
+#
+# Vertical format, see pack_vertical().
+#
+#   heightbytes: number of bytes of every column
+#
+def unpack_vertical(data, heightbytes):
+    n = data.shape[0]
+    cols = data[:, 1:].reshape(n, -1, heightbytes)
+    matrix = np.unpackbits(cols, axis=2, bitorder='little')
+    return data[:, 0].copy(), matrix.transpose(0, 2, 1)
+
+#
+# Page format, see pack_pages().
+#
+#   pages: number of pages of every glyph
+#   width: number of columns of every page
+#
+def unpack_pages(data, pages, width, msb_first = False):
+    n = data.shape[0]
+    cells = data[:, 1:].reshape(n, pages, width, 1)
+    matrix = np.unpackbits(cells, axis=3,
+            bitorder='big' if msb_first else 'little')
+    return data[:, 0].copy(), \
+            matrix.transpose(0, 1, 3, 2).reshape(n, pages * 8, width)
+
+#
+# RGB565 format, see pack_rgb565(). Pixels of the fg color are set.
+#
+#   width: number of columns of every glyph
+#
+def unpack_rgb565(data, width, fg, big_endian = True):
+    n = data.shape[0]
+    pixels = np.ascontiguousarray(data[:, 1:]).view(
+            '>u2' if big_endian else '<u2').reshape(n, -1, width)
+    return data[:, 0].copy(), (pixels == fg).astype(np.uint8)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
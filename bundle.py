@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+#
+import os
+from settings import *
+from bdf import BdfError
+from emit import COMPACT_GLYPH_SIZE, code_label, format_data_lines, \
+        format_metric_lines, format_range_lines, write_if_changed
+from fontlib import FontGenError, load_font, make_layout, pack_font
+from layout import LayoutError
+from rasterizer import RasterizerError
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Shared pool of glyph bitmaps.
+#
+# Bitmaps are keyed by their bytes, so a bitmap that several fonts have in
+# common, such as the digits of the weights of a monospace family, is stored
+# once. Fonts refer to the pool through the offsets in their lcd_glyph_compact
+# tables, which the compact format has anyway.
+#
+class GlyphPool(object):
+
+    def __init__(self):
+        self.offsets = {}
+        self.records = []
+        self.labels = []
+        self.size = 0
+        # bytes the bitmaps would take without sharing
+        self.total = 0
+
+    # offset of a bitmap in the pool, adding it when new
+    def add(self, bitmap, label):
+        self.total += len(bitmap)
+        offset = self.offsets.get(bitmap)
+        if offset is None:
+            offset = self.size
+            self.offsets[bitmap] = offset
+            if bitmap:
+                self.records.append(bitmap)
+                self.labels.append(label)
+                self.size += len(bitmap)
+        return offset
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Convert several fonts into one C header sharing a single glyph pool.
+#
+#   jobs: batch.Job list, see batch.build_jobs()
+#   name: bundle name, used for the file and the pool array
+#   outdir: output directory
+#   backend: rasterizer backend name, see rasterizer.py
+#   rle: run-length encode the bitmaps, see inc/lcd_font_rle.h
+#   use_cache: reuse glyph sets from the conversion cache
+#
+# Every font becomes a lcd_font_compact or lcd_font_v_compact (lcd_font_rle
+# or lcd_font_v_rle) whose data pointer is the shared pool. Identical bitmaps
+# are stored once and the saving is printed.
+#
+# Returns the path of the generated file or False on failure.
+#
+def generate_bundle(jobs, name,
+        outdir = DEFAULT_OUTPUT_DIR,
+        backend = DEFAULT_RASTERIZER,
+        rle = False,
+        use_cache = USE_CACHE):
+    pool = GlyphPool()
+    fonts = []
+    sources = []
+    count = 0
+
+    for job in jobs:
+        try:
+            layout = make_layout(job.ftype, compact = True)
+            glyphs = load_font(job.fname, job.psize, job.chars,
+                    backend = backend, use_cache = use_cache)
+            packed = pack_font(glyphs, job.ftype, compact = True, rle = rle)
+        except (FontGenError, LayoutError) as e:
+            print('')
+            print('> Cannot convert {}:'.format(job.fname), e)
+            print('')
+            return False
+        except RasterizerError as e:
+            print('')
+            print('> Failed to rasterize font:', e)
+            print('')
+            return False
+        except BdfError as e:
+            print('')
+            print('> Unsupported BDF file format:', e)
+            print('')
+            return False
+
+        # named without the compact tag, as all fonts of a bundle are compact
+        fname = glyphs.name(layout.tag, job.suffix)
+        offsets = [pool.add(bitmap, fname + ' ' + code_label(code))
+                for bitmap, code in zip(packed.bitmaps, packed.codes)]
+
+        fonts.append((fname, packed.struct_name, glyphs.font.fbby,
+                packed.metrics, offsets, packed.codes, packed.ranges))
+        sources.append(' *\t{}: {} {}\n'.format(fname,
+                os.path.basename(job.fname), job.ftype))
+        count += len(glyphs)
+
+    # ---------------------------------
+    # C header
+    #
+    cname = name.replace(' ', '_').replace('-', '_')
+    pool_name = cname.lower() + '_pool'
+    out = []
+    out.append('/*\n')
+    out.append(' * Font Bundle\n')
+    out.append(' *\n')
+    out.extend(sources)
+    out.append(' */\n\n')
+    out.append('#ifndef __{}_H_\n'.format(cname.upper()))
+    out.append('#define __{}_H_\n\n'.format(cname.upper()))
+    out.append('#include "lcd_font_rle.h"\n\n' if rle
+            else '#include "lcd_font.h"\n\n')
+
+    out.append('const uint8_t {}[] =\n'.format(pool_name))
+    out.append('{\n')
+    out.append(format_data_lines(pool.records, pool.labels))
+    out.append('};\n\n')
+
+    for fname, struct_name, height, metrics, offsets, codes, ranges in fonts:
+        out.append('const lcd_glyph_compact {}[] =\n'.format(
+                fname.lower() + '_glyphs'))
+        out.append('{\n')
+        out.append(format_metric_lines(metrics, None, codes, offsets))
+        out.append('};\n\n')
+        out.append('const lcd_font_range {}[] =\n'.format(
+                fname.lower() + '_ranges'))
+        out.append('{\n')
+        out.append(format_range_lines(ranges))
+        out.append('};\n\n')
+        out.append('{} {} = \n'.format(struct_name, fname))
+        out.append('{\n')
+        out.append('\t{},\n'.format(height))
+        out.append('\t{},\n'.format(len(ranges)))
+        out.append('\t{},\n'.format(fname.lower() + '_ranges'))
+        out.append('\t{},\n'.format(fname.lower() + '_glyphs'))
+        out.append('\t{},\n'.format(pool_name))
+        out.append('};\n\n')
+
+    out.append('#endif // __{}_H_'.format(cname.upper()))
+
+    outname = os.path.join(outdir, cname + '.h')
+    write_if_changed(outname, ''.join(out))
+
+    # ---------------------------------
+    # report the saving of the shared pool
+    saved = pool.total - pool.size
+    print('> {}: {} glyphs of {} fonts, {} unique bitmaps'.format(cname,
+            count, len(fonts), len(pool.records)))
+    print('> {}: pool {} bytes, {} bytes unshared, {} bytes ({:.1f}%) saved, '
+            'metrics {} bytes'.format(cname, pool.size, pool.total, saved,
+            100.0 * saved / pool.total if pool.total else 0.0,
+            COMPACT_GLYPH_SIZE * count))
+
+    return outname
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
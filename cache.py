@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+#
+import hashlib
+import os
+import pickle
+import tempfile
+from settings import *
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Content hash of a file.
+#
+def file_digest(fname):
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+#
+# Cache key from any number of parameters. Parameters are hashed through
+# their repr, so they should be plain values such as str, int or tuple.
+#
+def make_key(*parts):
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Content-addressed on-disk cache with size-bounded LRU eviction.
+#
+#   path: cache directory
+#   max_size: upper bound of the total size of the entries in bytes
+#
+# Each entry is one pickle file named after its key. Hits refresh the file
+# mtime, and when the total size exceeds max_size the entries with the oldest
+# mtime are removed. Entries are written to a temporary file and renamed, so
+# several processes can share a cache directory. Entries that no longer load,
+# e.g. pickled by an older version of the classes, are removed and rebuilt.
+#
+class Cache(object):
+
+    def __init__(self, path = DEFAULT_CACHE_DIR, max_size = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+
+    def _entry(self, key):
+        return os.path.join(self.path, key + '.pickle')
+
+    def get(self, key):
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                value = pickle.load(f)
+        except IOError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError,
+                TypeError, ValueError):
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+            return None
+        # mark as recently used
+        try:
+            os.utime(entry, None)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, self._entry(key))
+        except BaseException:
+            os.remove(tmpname)
+            raise
+        self.evict()
+
+    # remove least recently used entries until the cache fits max_size
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            if not name.endswith('.pickle'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+            total -= size
+
+    # remove every entry
+    def purge(self):
+        if not os.path.exists(self.path):
+            return
+        for name in os.listdir(self.path):
+            if name.endswith('.pickle') or name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
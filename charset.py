@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+from bisect import bisect_right
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Unicode blocks that can be named in a character set specification.
+# Names are matched case-insensitively with spaces, '-' and '_' ignored.
+#
+UNICODE_BLOCKS = {
+    'Basic Latin': (0x0020, 0x007e),
+    'Latin-1 Supplement': (0x00a0, 0x00ff),
+    'Latin Extended-A': (0x0100, 0x017f),
+    'Latin Extended-B': (0x0180, 0x024f),
+    'IPA Extensions': (0x0250, 0x02af),
+    'Greek': (0x0370, 0x03ff),
+    'Cyrillic': (0x0400, 0x04ff),
+    'Hebrew': (0x0590, 0x05ff),
+    'Arabic': (0x0600, 0x06ff),
+    'Thai': (0x0e00, 0x0e7f),
+    'General Punctuation': (0x2000, 0x206f),
+    'Superscripts and Subscripts': (0x2070, 0x209f),
+    'Currency Symbols': (0x20a0, 0x20cf),
+    'Letterlike Symbols': (0x2100, 0x214f),
+    'Number Forms': (0x2150, 0x218f),
+    'Arrows': (0x2190, 0x21ff),
+    'Mathematical Operators': (0x2200, 0x22ff),
+    'Miscellaneous Technical': (0x2300, 0x23ff),
+    'Box Drawing': (0x2500, 0x257f),
+    'Block Elements': (0x2580, 0x259f),
+    'Geometric Shapes': (0x25a0, 0x25ff),
+    'Miscellaneous Symbols': (0x2600, 0x26ff),
+    'Dingbats': (0x2700, 0x27bf),
+    'CJK Symbols and Punctuation': (0x3000, 0x303f),
+    'Hiragana': (0x3040, 0x309f),
+    'Katakana': (0x30a0, 0x30ff),
+    'CJK Unified Ideographs': (0x4e00, 0x9fff),
+    'Hangul Syllables': (0xac00, 0xd7a3),
+    'Halfwidth and Fullwidth Forms': (0xff00, 0xffef),
+}
+
+def _block_key(name):
+    return ''.join(c for c in name.lower() if c not in ' -_')
+
+_BLOCKS = {_block_key(k): v for k, v in UNICODE_BLOCKS.items()}
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Parse one code point: 65, 0x41, U+0041 or a single character such as A.
+#
+def _parse_code(text):
+    text = text.strip()
+    if text[:2] in ('U+', 'u+'):
+        return int(text[2:], 16)
+    if len(text) == 1 and not text.isdigit():
+        return ord(text)
+    return int(text, 0)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Parse a character set specification into a sorted tuple of code points.
+#
+#   spec: comma separated items, or an iterable of items and code points.
+#       An item is a code point, a range 'first-last' or 'first_last', or
+#       the name of a Unicode block in UNICODE_BLOCKS.
+#
+#   parse_charset('0x20-0x7e, Latin-1 Supplement, Greek, U+2190-U+21FF')
+#
+def parse_charset(spec):
+    if isinstance(spec, str):
+        items = [x for x in spec.split(',') if x.strip()]
+    else:
+        items = spec
+
+    codes = set()
+    for item in items:
+        if isinstance(item, int):
+            codes.add(item)
+            continue
+        item = item.strip()
+        block = _BLOCKS.get(_block_key(item))
+        if block is not None:
+            codes.update(range(block[0], block[1] + 1))
+            continue
+
+        # a range, but a single '-' or '_' is a character
+        first, mid, last = '', '', ''
+        if len(item) > 1:
+            sep = '_' if '_' in item else '-'
+            first, mid, last = item.partition(sep)
+        if first and mid and last:
+            start, end = _parse_code(first), _parse_code(last)
+            if start > end:
+                raise ValueError('empty character range: ' + item)
+            codes.update(range(start, end + 1))
+        else:
+            codes.add(_parse_code(item))
+
+    return tuple(sorted(codes))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Split sorted code points into runs of consecutive codes.
+#
+# Returns a list of (startcode, count, index) where index is the position of
+# startcode in codes, as in the lcd_font_range struct.
+#
+def code_ranges(codes):
+    ranges = []
+    for idx, code in enumerate(codes):
+        if ranges and ranges[-1][0] + ranges[-1][1] == code:
+            start, count, first = ranges[-1]
+            ranges[-1] = (start, count + 1, first)
+        else:
+            ranges.append((code, 1, idx))
+    return ranges
+
+#
+# Index of a code point in the glyph array or -1, by binary search over the
+# range table. This is the reference of lcd_font_find() in inc/lcd_font.h.
+#
+def find_code(ranges, code):
+    pos = bisect_right(ranges, (code, float('inf'))) - 1
+    if pos < 0:
+        return -1
+    start, count, index = ranges[pos]
+    if code - start < count:
+        return index + code - start
+    return -1
+
+#
+# Character set specification of sorted code points, the inverse of
+# parse_charset().
+#
+def charset_spec(codes):
+    return ','.join('0x{:02x}'.format(start) if count == 1 else
+            '0x{:02x}-0x{:02x}'.format(start, start + count - 1)
+            for start, count, index in code_ranges(codes))
+
+#
+# True when the code points form one range that fits the char fields of the
+# lcd_font and lcd_font_v structs.
+#
+def is_dense(codes):
+    return len(codes) > 0 and codes[-1] <= 0xff \
+            and codes[-1] - codes[0] + 1 == len(codes)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
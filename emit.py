@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+#
+import json
+import os
+from charset import code_ranges
+from fontbin import build_font_bin
+
+# C hex literal of every byte value, as used in the glyph arrays
+HEX_LITERALS = ['0x{:02x},'.format(x) for x in range(256)]
+
+# sizeof(lcd_font_range) and sizeof(lcd_glyph_compact) in inc/lcd_font.h
+RANGE_SIZE = 12
+COMPACT_GLYPH_SIZE = 12
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Comment label of a character code, the character itself for printable ASCII
+# but the backslash, which would continue the line comment.
+#
+def code_label(code):
+    if 0x20 <= code <= 0x7e and code != 0x5c:
+        return '\'{:c}\''.format(code)
+    return 'U+{:04X}'.format(code)
+
+#
+# Text of the glyph array body, one glyph per line.
+#
+#   data: uint8 array of shape (glyphs, bytes per glyph) or a list of bytes
+#   codes: character code of each glyph, used for the comments
+#
+def format_glyph_lines(data, codes):
+    return format_data_lines(data, [code_label(code) for code in codes])
+
+#
+# Text of a byte array body, one record per line followed by its label.
+#
+#   data: uint8 array of shape (records, bytes per record) or a list of bytes
+#   labels: comment of each line
+#
+def format_data_lines(data, labels):
+    hexes = HEX_LITERALS
+    lines = []
+    if hasattr(data, 'tolist'):
+        data = data.tolist()
+    for row, label in zip(data, labels):
+        lines.append('\t' + ''.join([hexes[x] for x in row])
+                + ' // ' + label + '\n')
+    return ''.join(lines)
+
+#
+# Text of a lcd_glyph_compact array body.
+#
+#   metrics: width, height, xoffset, yoffset and advance of each glyph
+#   bitmaps: bytes of each glyph, to compute the data offsets
+#   codes: character code of each glyph, used for the comments
+#   offsets: position of each bitmap in the data array, by default the
+#       bitmaps are back to back
+#
+def format_metric_lines(metrics, bitmaps, codes, offsets = None):
+    if offsets is None:
+        offsets = []
+        offset = 0
+        for bitmap in bitmaps:
+            offsets.append(offset)
+            offset += len(bitmap)
+    lines = []
+    for m, offset, code in zip(metrics.tolist(), offsets, codes):
+        lines.append('\t{{ {}, {}, {}, {}, {}, {} }}, // {}\n'.format(
+                offset, m[0], m[1], m[2], m[3], m[4], code_label(code)))
+    return ''.join(lines)
+
+#
+# Text of a lcd_font_range array body.
+#
+#   ranges: (startcode, count, index) tuples from charset.code_ranges()
+#
+def format_range_lines(ranges):
+    return ''.join('\t{{ 0x{:04x}, {}, {} }},\n'.format(*r) for r in ranges)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Write text or bytes into a file unless the file already holds exactly the
+# same contents.
+#
+# Leaving an identical file untouched keeps its mtime, so a firmware build
+# does not recompile everything that includes it. Returns True when the file
+# was written.
+#
+def write_if_changed(fname, text):
+    mode = 'b' if isinstance(text, (bytes, bytearray)) else ''
+    try:
+        with open(fname, 'r' + mode) as f:
+            if f.read() == text:
+                return False
+    except IOError:
+        pass
+
+    dirname = os.path.dirname(fname)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname, exist_ok=True)
+    with open(fname, 'w' + mode) as f:
+        f.write(text)
+    return True
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Emitters turn a fontlib.PackedFont into file contents. They return
+# {file name: contents}, the main file first, and write nothing.
+#
+#   packed: PackedFont from fontlib.pack_font()
+#   suffix: string appended to the output name, e.g. to tell ranges apart
+#
+
+#
+# C header.
+#
+#   split: glyphs per array, larger fixed size glyph sets are written as
+#       lcd_font_chunked or lcd_font_v_chunked with one header per array,
+#       0 for no limit
+#
+# Fonts with a single range of codes up to 0xff are written as lcd_font or
+# lcd_font_v, any other as lcd_font_sparse or lcd_font_v_sparse with a range
+# table, and compact fonts as lcd_font_compact or lcd_font_rle.
+#
+def emit_header(packed, suffix = '', split = 0):
+    glyphs = packed.glyphs
+    font = glyphs.font
+    props = font.properties
+    fname = packed.name(suffix)
+    lower = fname.lower()
+    codes = packed.codes
+    ranges = packed.ranges
+    struct_name = packed.struct_name
+    addstyle_name = str(props.get('ADD_STYLE_NAME', ''))
+    source = glyphs.fname
+
+    out = []
+    out.append('/*\n')
+    out.append(' * Font Information\n')
+    out.append(' *\n')
+    out.append(' *\tfont source: {}\n'.format(source[source.rfind('/')+1:]))
+    out.append(' *\tfamily name: {}\n'.format(props.get('FAMILY_NAME', '')))
+    out.append(' *\tweight name: {}\n'.format(props.get('WEIGHT_NAME', '')))
+    out.append(' *\tslant: {}\n'.format(props.get('SLANT', '')))
+    out.append(' *\tsetwidth name: {}\n'.format(
+            props.get('SETWIDTH_NAME', '')))
+    if addstyle_name != '':
+        out.append(' *\taddstyle name: {}\n'.format(addstyle_name))
+    out.append(' *\tpoint size: {}\n'.format(font.point_size))
+    out.append(' *\tbounding box: ({},{})\n'.format(font.fbbx, font.fbby))
+    out.append(' *\tdata format: {}\n'.format(packed.ftype))
+    out.append(' */\n\n')
+
+    out.append('#ifndef __{}_H_\n'.format(fname.upper()))
+    out.append('#define __{}_H_\n\n'.format(fname.upper()))
+    if packed.rle:
+        out.append('#include "lcd_font_rle.h"\n\n')
+    else:
+        out.append('#include "lcd_font.h"\n\n')
+
+    files = {fname + '.h': None}
+
+    # split large glyph arrays into several arrays and files
+    parts = split > 0 and not packed.compact and len(codes) > split
+    if parts:
+        ranges = code_ranges(codes)
+        struct_name = packed.layout.struct_name + '_chunked'
+
+        # one header per array, included here
+        names = []
+        for k, start in enumerate(range(0, len(codes), split)):
+            names.append(lower + '_glyph_{}'.format(k))
+            partname = '{}_{}'.format(fname, k)
+            files[partname + '.h'] = ''.join([
+                    '#ifndef __{}_H_\n'.format(partname.upper()),
+                    '#define __{}_H_\n\n'.format(partname.upper()),
+                    '#include "lcd_font.h"\n\n',
+                    'const uint8_t {}[] =\n'.format(names[-1]),
+                    '{\n',
+                    format_glyph_lines(packed.data[start:start+split],
+                            codes[start:start+split]),
+                    '};\n\n',
+                    '#endif // __{}_H_'.format(partname.upper())])
+            out.append('#include "{}.h"\n'.format(partname))
+        out.append('\n')
+        out.append('const uint8_t *const {}[] =\n'.format(lower + '_chunks'))
+        out.append('{\n')
+        out.extend('\t{},\n'.format(name) for name in names)
+    elif packed.compact:
+        out.append('const uint8_t {}[] =\n'.format(lower + '_data'))
+        out.append('{\n')
+        out.append(format_glyph_lines(packed.bitmaps, codes))
+        out.append('};\n\n')
+        out.append('const lcd_glyph_compact {}[] =\n'.format(
+                lower + '_glyphs'))
+        out.append('{\n')
+        out.append(format_metric_lines(packed.metrics, packed.bitmaps, codes))
+    else:
+        out.append('const uint8_t {}[] =\n'.format(lower + '_glyph'))
+        out.append('{\n')
+        out.append(format_glyph_lines(packed.data, codes))
+    out.append('};\n\n')
+
+    # code range table of sparse and compact fonts
+    if ranges is not None:
+        out.append('const lcd_font_range {}[] =\n'.format(lower + '_ranges'))
+        out.append('{\n')
+        out.append(format_range_lines(ranges))
+        out.append('};\n\n')
+
+    out.append('{} {} = \n'.format(struct_name, fname))
+    out.append('{\n')
+    if packed.compact:
+        out.append('\t{},\n'.format(font.fbby))
+    else:
+        out.append('\t{},\n'.format(packed.bytesper))
+        out.append('\t{},\n'.format(packed.lines))
+    if ranges is None:
+        out.append('\t0x{:02x},\n'.format(codes[0]))
+        out.append('\t0x{:02x},\n'.format(codes[-1]))
+    else:
+        out.append('\t{},\n'.format(len(ranges)))
+        out.append('\t{},\n'.format(lower + '_ranges'))
+    if parts:
+        out.append('\t{},\n'.format(split))
+        out.append('\t{},\n'.format(lower + '_chunks'))
+    elif packed.compact:
+        out.append('\t{},\n'.format(lower + '_glyphs'))
+        out.append('\t{},\n'.format(lower + '_data'))
+    else:
+        out.append('\t{},\n'.format(lower + '_glyph'))
+    out.append('};\n\n')
+    out.append('#endif // __{}_H_'.format(fname.upper()))
+
+    files[fname + '.h'] = ''.join(out)
+    return files
+
+#
+# Binary container, see fontbin.py. Fixed size glyphs packed into a container
+# by pack_font() are returned as they are, without a copy.
+#
+def emit_binary(packed, suffix = ''):
+    codes = packed.codes
+    if packed.compact:
+        content = build_font_bin([m.tobytes() + b
+                for m, b in zip(packed.metrics, packed.bitmaps)],
+                packed.ftype + ('-rle' if packed.rle else '-compact'), 0,
+                packed.glyphs.font.fbby, codes[0], codes[-1], packed.ranges)
+    elif packed.blob is not None:
+        content = packed.blob
+    else:
+        content = build_font_bin(packed.data, packed.ftype, packed.bytesper,
+                packed.lines, codes[0], codes[-1], packed.ranges)
+    return {packed.name(suffix) + '.bin': content}
+
+#
+# JSON document, e.g. for tools and tests that check glyph data without a C
+# compiler. Glyph data is given as hex strings, fixed size glyphs with their
+# width and compact glyphs with their metrics, see bitmap.pack_compact().
+#
+def emit_json(packed, suffix = ''):
+    font = packed.glyphs.font
+    props = font.properties
+    glyphs = []
+    if packed.compact:
+        for code, m, bitmap in zip(packed.codes, packed.metrics.tolist(),
+                packed.bitmaps):
+            glyphs.append({'code': code, 'width': m[0], 'height': m[1],
+                    'xoffset': m[2], 'yoffset': m[3], 'advance': m[4],
+                    'data': bitmap.hex()})
+    else:
+        for code, row in zip(packed.codes, packed.data):
+            glyphs.append({'code': code, 'width': int(row[0]),
+                    'data': row[1:].tobytes().hex()})
+
+    doc = {
+        'name': packed.name(suffix),
+        'source': os.path.basename(packed.glyphs.fname),
+        'family_name': str(props.get('FAMILY_NAME', '')),
+        'weight_name': str(props.get('WEIGHT_NAME', '')),
+        'slant': str(props.get('SLANT', '')),
+        'point_size': font.point_size,
+        'bounding_box': [font.fbbx, font.fbby, font.xoff, font.yoff],
+        'layout': packed.ftype,
+        'compact': packed.compact,
+        'rle': packed.rle,
+        'struct': packed.struct_name,
+        'bytesper': packed.bytesper,
+        'lines': packed.lines,
+        'ranges': [list(r) for r in packed.ranges] if packed.ranges else None,
+        'glyphs': glyphs,
+    }
+    return {packed.name(suffix) + '.json': json.dumps(doc, indent=1)}
+
+#
+# Write emitted files into a directory, leaving unchanged files untouched.
+# Returns the paths in the order of files.
+#
+def write_files(files, outdir):
+    paths = []
+    for name, content in files.items():
+        paths.append(os.path.join(outdir, name))
+        write_if_changed(paths[-1], content)
+    return paths
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
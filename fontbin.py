@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+#
+from bisect import bisect_right
+import mmap
+import struct
+import numpy as np
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Binary font container, see inc/lcd_font_bin.h for the C side.
+#
+# All fields are little-endian. The file starts with a fixed 44 byte header:
+#
+#   magic: 'LCDF'
+#   version: container format version
+#   layout: glyph data layout, see LAYOUT_CODES
+#   flags: FLAG_OFFSETS and FLAG_RANGES for the optional tables
+#   count: number of glyphs
+#   glyph_size: number of bytes of each glyph, 0 for variable size glyphs
+#   glyph_stride: distance between glyphs in the data section, 0 for variable
+#       size glyphs
+#   bytesper: widthbytes (horizontal) or heightbytes (vertical), see the
+#       geometry of the layouts in layout.py
+#   lines: height (horizontal) or width (vertical)
+#   first_code, last_code: character codes of the first and the last glyph
+#   offsets_offset: file offset of the glyph offset table, 0 if absent
+#   data_offset: file offset of the glyph data
+#   ranges_offset: file offset of the code range table, 0 if absent
+#
+# The optional offset table holds count + 1 uint32 entries, relative to
+# data_offset, so glyph i spans offsets[i] to offsets[i+1]. Without it glyph i
+# starts at data_offset + i * glyph_stride.
+#
+# The optional range table maps sparse character codes to glyph indices. It
+# starts with the uint32 number of ranges followed by (startcode, count, index)
+# uint32 triplets sorted by startcode, as the lcd_font_range struct. Without it
+# glyph i belongs to first_code + i.
+#
+# Sections start on an 'align' byte
+# boundary and glyphs are padded to glyph_stride so that they can be read
+# directly from memory-mapped or external flash.
+#
+# Compact layouts store variable size glyphs and always have the offset
+# table. Each glyph starts with the five lcd_glyph_compact metric bytes width,
+# height, xoffset, yoffset and advance, followed by the cropped bitmap. The
+# rle layouts are the same with run-length encoded bitmaps, see rle.py.
+#
+MAGIC = b'LCDF'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHBBIIIHHIIIII')
+HEADER_FIELDS = ('magic', 'version', 'layout', 'flags', 'count',
+        'glyph_size', 'glyph_stride', 'bytesper', 'lines',
+        'first_code', 'last_code', 'offsets_offset', 'data_offset',
+        'ranges_offset')
+
+FLAG_OFFSETS = 0x01
+FLAG_RANGES = 0x02
+
+LAYOUT_CODES = {'horizontal': 0, 'vertical': 1,
+        'horizontal-compact': 2, 'vertical-compact': 3,
+        'horizontal-rle': 4, 'vertical-rle': 5,
+        'horizontal-lsb': 6, 'page': 7, 'page-msb': 8, 'rgb565': 9}
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Round n up to a multiple of align.
+#
+def _align(n, align):
+    return (n + align - 1) // align * align
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Allocate a container of fixed size glyphs to be filled in place.
+#
+#   count: number of glyphs
+#   glyph_size: number of bytes of each glyph
+#   other parameters as for build_font_bin()
+#
+# Returns (blob, data) where blob is the zeroed container as a bytearray and
+# data a uint8 array of shape (count, glyph_size) viewing its glyph data, so
+# that large fonts can be packed straight into the container.
+#
+def new_font_bin(count, glyph_size, layout, bytesper, lines, first_code,
+        last_code, ranges = None, offsets = False, align = 4, glyph_align = 1):
+    glyph_stride = _align(glyph_size, glyph_align)
+    starts = range(0, (count + 1) * glyph_stride, glyph_stride)
+    blob = _new_blob(count, glyph_size, glyph_stride, starts, layout,
+            bytesper, lines, first_code, last_code, ranges, offsets, align)
+    data_offset = len(blob) - starts[-1]
+    data = np.frombuffer(blob, dtype=np.uint8, offset=data_offset)
+    return blob, data.reshape(count, glyph_stride)[:, :glyph_size]
+
+#
+# Build a container.
+#
+#   data: uint8 array of shape (glyphs, glyph_size), as returned by the
+#       packers, or a list of bytes for variable size glyphs
+#   layout: name of the glyph data layout
+#   bytesper, lines: glyph geometry as in the lcd_font structs
+#   first_code, last_code: character codes of the first and the last glyph
+#   ranges: (startcode, count, index) code ranges of sparse glyph sets
+#   offsets: emit the glyph offset table
+#   align: alignment of the sections in bytes
+#   glyph_align: alignment of every glyph in bytes
+#
+# Returns the container as bytes.
+#
+def build_font_bin(data, layout, bytesper, lines, first_code, last_code,
+        ranges = None, offsets = False, align = 4, glyph_align = 1):
+    if not isinstance(data, list):
+        blob, view = new_font_bin(data.shape[0], data.shape[1], layout,
+                bytesper, lines, first_code, last_code, ranges, offsets,
+                align, glyph_align)
+        view[:] = data
+        return bytes(blob)
+
+    # variable size glyphs, located by the offset table only
+    starts = [0]
+    for glyph in data:
+        starts.append(starts[-1] + _align(len(glyph), glyph_align))
+    blob = _new_blob(len(data), 0, 0, starts, layout, bytesper, lines,
+            first_code, last_code, ranges, True, align)
+    data_offset = len(blob) - starts[-1]
+    for idx, glyph in enumerate(data):
+        pos = data_offset + starts[idx]
+        blob[pos:pos+len(glyph)] = glyph
+    return bytes(blob)
+
+#
+# Zeroed container with the header and the tables filled in.
+#
+def _new_blob(count, glyph_size, glyph_stride, starts, layout, bytesper,
+        lines, first_code, last_code, ranges, offsets, align):
+    pos = _align(HEADER.size, align)
+    ranges_offset = 0
+    if ranges:
+        ranges_offset = pos
+        pos = _align(pos + 4 + 12 * len(ranges), align)
+    offsets_offset = 0
+    if offsets:
+        offsets_offset = pos
+        pos = _align(pos + 4 * (count + 1), align)
+    data_offset = pos
+
+    blob = bytearray(data_offset + starts[-1])
+    flags = (FLAG_OFFSETS if offsets else 0) | (FLAG_RANGES if ranges else 0)
+    HEADER.pack_into(blob, 0, MAGIC, VERSION, LAYOUT_CODES[layout], flags,
+            count, glyph_size, glyph_stride, bytesper, lines, first_code,
+            last_code, offsets_offset, data_offset, ranges_offset)
+
+    if ranges:
+        struct.pack_into('<I', blob, ranges_offset, len(ranges))
+        for idx, r in enumerate(ranges):
+            struct.pack_into('<3I', blob, ranges_offset + 4 + 12 * idx, *r)
+
+    if offsets:
+        struct.pack_into('<{}I'.format(count + 1), blob, offsets_offset,
+                *starts)
+
+    return blob
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Raised for files that are not valid containers.
+#
+class FontBinError(ValueError):
+    pass
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Read-only container opened with mmap.
+#
+# Header fields are available as attributes. Indexing returns a zero-copy
+# memoryview of one glyph, so large font packs can be inspected without
+# reading them into memory. Views must be released before the container is
+# closed.
+#
+#   with FontBin('font.bin') as font:
+#       width = font.glyph_for_code(ord('A'))[0]
+#
+class FontBin(object):
+
+    def __init__(self, fname):
+        self._offsets = 0
+        with open(fname, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise FontBinError('empty file')
+        self._view = memoryview(self._mmap)
+
+        if len(self._mmap) < HEADER.size:
+            self.close()
+            raise FontBinError('file too short')
+        self.__dict__.update(zip(HEADER_FIELDS,
+                HEADER.unpack_from(self._mmap, 0)))
+        if self.magic != MAGIC or self.version != VERSION:
+            self.close()
+            raise FontBinError('not a version {} font container'.format(
+                    VERSION))
+
+        self.layout_name = {v: k for k, v in LAYOUT_CODES.items()}.get(
+                self.layout)
+        if self.flags & FLAG_OFFSETS:
+            self._offsets = self.offsets_offset
+
+        # the range table is small, keep it as a list
+        self.ranges = None
+        if self.flags & FLAG_RANGES:
+            n = struct.unpack_from('<I', self._mmap, self.ranges_offset)[0]
+            self.ranges = [struct.unpack_from('<3I', self._mmap,
+                    self.ranges_offset + 4 + 12 * idx) for idx in range(n)]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('glyph index out of range')
+        if self._offsets:
+            start, stop = struct.unpack_from('<2I', self._mmap,
+                    self._offsets + 4 * index)
+            start += self.data_offset
+            stop = start + self.glyph_size if self.glyph_size \
+                    else self.data_offset + stop
+        else:
+            start = self.data_offset + index * self.glyph_stride
+            stop = start + self.glyph_size
+        return self._view[start:stop]
+
+    # glyph of a character code or None
+    def glyph_for_code(self, code):
+        if not self.first_code <= code <= self.last_code:
+            return None
+        if self.ranges is None:
+            return self[code - self.first_code]
+        pos = bisect_right(self.ranges, (code, 0xffffffff, 0)) - 1
+        start, count, index = self.ranges[pos]
+        if code - start >= count:
+            return None
+        return self[index + code - start]
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -2,400 +2,395 @@
 #
 from glob import glob
 import os
-import numpy as np
 from settings import *
+from bdf import BdfError
+from cache import Cache, file_digest, make_key
+from charset import charset_spec, is_dense, parse_charset
+from emit import RANGE_SIZE, emit_binary, emit_header, emit_json, write_files
+from fontlib import GENERATOR_VERSION, Cancelled, FontGenError, \
+        glyph_cache_key, load_font, make_layout, pack_font, select_codes
+from layout import LayoutError
+from metrics import Metrics
+from rasterizer import RasterizerError
+from rle import rle_stats
+from subset import collect_codes
+
+# output formats and their emitters, see emit.py
+EMITTERS = {'header': emit_header, 'binary': emit_binary, 'json': emit_json}
 
 #--------1---------2---------3---------4---------5---------6---------7---------8
 #
 # Convert a font into bdf format using otf2bdf then generate LCD font fle.
-# The otf2bdf is required to be installed to run this script.
+# The otf2bdf is required to be installed to run this script unless another
+# rasterizer backend is selected.
 #
 #   fname: source font file, otf or ttf
-#   ftype: either 'horizontal' or 'vertical'
+#   ftype: glyph data layout, 'horizontal', 'vertical' or any other layout
+#       registered in layout.py
 #   psize: font size in pixel unit
 #   start_ch: starting ASCII code
 #   end_ch: ending ASCII code
+#   chars: character set to convert instead of start_ch..end_ch, either a
+#       specification string or a list of codes, see charset.parse_charset()
+#   sources: convert only the characters the strings of these files use, in
+#       addition to chars, see subset.py
+#   outdir: output directory
+#   suffix: string appended to the output name, e.g. to tell ranges apart
+#   backend: rasterizer backend name, see rasterizer.py
+#   oformat: 'header' for a C header, 'binary' for a font container or 'json'
+#       for a JSON document, see EMITTERS
+#   compact: crop every glyph to its ink, see lcd_font_compact
+#   rle: run-length encode the cropped glyphs, see inc/lcd_font_rle.h
+#   colors: (fg, bg) RGB565 colors of the rgb565 layout
+#   split: glyphs per array, larger glyph sets are written as lcd_font_chunked
+#       or lcd_font_v_chunked with one header per array, 0 for no limit
+#   memory_limit: approximate ceiling of the memory used to render and pack
+#       glyphs in bytes, see bitmap.chunk_size()
+#   use_cache: reuse glyph sets and outputs from the conversion cache
+#   metrics: Metrics instance that receives the stage timings and counters,
+#       see metrics.py, and the paths of all files written in info['files']
+#   progress: progress(done, total) called with the number of glyphs packed,
+#       0 once the font is rasterized, then after every chunk. Raising
+#       fontlib.Cancelled in it stops the conversion.
+#
+# Returns the path of the generated file or False on failure, after printing
+# the reason. The bdf data is streamed from the rasterizer, so several
+# conversions can run at once.
+#
+# This is load_font(), pack_font() and an emitter of fontlib.py and emit.py
+# in a row, plus the cache and the files. Compact fonts print their saving
+# over the padded format, and run-length encoded fonts their compression
+# ratio and decode cost.
+#
+# The cache is keyed on the font file contents, every parameter and the
+# generator version. It holds the rasterized glyph set, which is shared by
+# all layouts, and the generated files themselves.
 #
 def generate_font_file(fname,
         ftype = DEFAULT_OUTPUT_TYPE,
         psize = DEFAULT_POINT_SIZE,
         start_ch = DEFAULT_START_CHAR,
-        end_ch = DEFAULT_END_CHAR):
+        end_ch = DEFAULT_END_CHAR,
+        chars = None,
+        sources = None,
+        outdir = DEFAULT_OUTPUT_DIR,
+        suffix = '',
+        backend = DEFAULT_RASTERIZER,
+        oformat = DEFAULT_OUTPUT_FORMAT,
+        compact = False,
+        rle = False,
+        colors = None,
+        split = DEFAULT_SPLIT,
+        memory_limit = DEFAULT_MEMORY_LIMIT,
+        use_cache = USE_CACHE,
+        metrics = None,
+        progress = None):
+
+    if metrics is None:
+        metrics = Metrics()
+    metrics.info.update(font=fname, layout=ftype, format=oformat, size=psize)
+    compact = compact or rle
+    cache = None
 
-    # generate bdf from otf
-    os.system('otf2bdf'
-                + ' -p ' + str(psize)
-                + ' -l ' + '\'' + str(start_ch) + '_' + str(end_ch) + '\''
-                + ' -o bdfdata ' + fname)
-
-    # open bdf data file
     try:
-        f = open('bdfdata')
-    except:
+        # fail early on bad arguments
+        make_layout(ftype, compact, colors)
+        if oformat not in EMITTERS:
+            raise FontGenError('unknown output format: {}'.format(oformat))
+        codes = select_codes(chars, sources, start_ch, end_ch)
+        metrics.lap('charset')
+
+        # look up the cache first
+        if use_cache:
+            try:
+                digest = file_digest(fname)
+            except IOError:
+                # leave the error to the rasterizer
+                digest = None
+            if digest is not None:
+                cache = Cache()
+                out_key = make_key(glyph_cache_key(digest, backend, psize,
+                        codes), os.path.basename(fname), ftype, oformat,
+                        compact, rle, colors, split, suffix)
+
+                files = cache.get(out_key)
+                metrics.lap('cache')
+                if files is not None:
+                    paths = write_files(files, outdir)
+                    metrics.info['files'] = paths
+                    metrics.count('cache_hits')
+                    metrics.count('output_bytes',
+                            sum(os.path.getsize(p) for p in paths))
+                    metrics.lap('write')
+                    return paths[0]
+
+        glyphs = load_font(fname, psize, codes, backend = backend,
+                use_cache = use_cache, metrics = metrics)
+
+        # ---------------------------------
+        if DEBUG_OUT:
+            font = glyphs.font
+            print('')
+            print('version:', font.version)
+            print('point size:', font.point_size)
+            print('bounding box:', font.fbbx, font.fbby, font.xoff, font.yoff)
+            for prop in ('FAMILY_NAME', 'WEIGHT_NAME', 'SLANT',
+                    'SETWIDTH_NAME', 'ADD_STYLE_NAME', 'PIXEL_SIZE',
+                    'SPACING'):
+                print(prop.lower().replace('_', ' ') + ':',
+                        font.properties.get(prop, ''))
+            for glyph in font:
+                print('glyph: ', glyph)
+
+        if progress is not None:
+            progress(0, len(glyphs))
+        packed = pack_font(glyphs, ftype, compact, rle, colors,
+                oformat == 'binary', memory_limit, metrics, progress)
+
+    except Cancelled:
+        print('> Conversion of {} cancelled'.format(fname))
+        return False
+    except (FontGenError, LayoutError) as e:
         print('')
-        print('> Failed to open bdf file.')
+        print('> Cannot convert {}:'.format(fname), e)
         print('')
         return False
-
-    # file version
-    version = 0.0
-    for line in f:
-        if 'STARTFONT' in line:
-            version = float(line.split(' ')[1])
-            break
-
-    if version != 2.1:
+    except RasterizerError as e:
         print('')
-        print('> Unsupported BDF file format')
+        print('> Failed to rasterize font:', e)
         print('')
         return False
-
-    # font size in point
-    for line in f:
-        if 'SIZE' in line:
-            point_size = int(line.split(' ')[1])
-            break
-
-    # bounding box
-    for line in f:
-        if 'FONTBOUNDINGBOX' in line:
-            fbbx, fbby, xoff, yoff = [int(x) for x in (line.split(' ')[1:])]
-            break
-
-    # family name
-    for line in f:
-        if 'FAMILY_NAME' in line:
-            family_name = line.partition(' ')[2].strip('\n').strip('"')
-            break
-
-    # weight name
-    for line in f:
-        if 'WEIGHT_NAME' in line:
-            weight_name = line.partition(' ')[2].strip('\n').strip('"')
-            break
-
-    # slant
-    for line in f:
-        if 'SLANT' in line:
-            slant = line.partition(' ')[2].strip('\n').strip('"')
-            break;
-
-    # setwidth_name
-    for line in f:
-        if 'SETWIDTH_NAME' in line:
-            setwidth_name = line.partition(' ')[2].strip('\n').strip('"')
-            break;
-
-    # addstyle_name
-    for line in f:
-        if 'ADD_STYLE_NAME' in line:
-            addstyle_name = line.partition(' ')[2].strip('\n').strip('"')
-            break;
-
-    # pixel size
-    for line in f:
-        if 'PIXEL_SIZE' in line:
-            pixel_size = int(line.partition(' ')[2])
-            break;
-
-    # spacing
-    for line in f:
-        if 'SPACING' in line:
-            spacing = line.partition(' ')[2].strip('\n').strip('"')
-            break;
-
-    # skip the rest of the properties
-    for line in f:
-        if 'ENDPROPERTIES' in line:
-            break;
-
-    # ---------------------------------
-    # decode each glyph data
-    glyphdata = []
-    for line in  f:
-        # new character
-        if 'STARTCHAR' in line:
-            glyph = {}
-        # character code
-        if 'ENCODING' in line:
-            glyph['ENCODING'] = int(line.split(' ')[1])
-        # width
-        elif 'DWIDTH' in line:
-            glyph['DWIDTH'] = int(line.split(' ')[1])
-        # bounding box
-        elif 'BBX' in line:
-            glyph['BBX'] = [int(x) for x in (line.split(' ')[1:])]
-        # bitmap data
-        elif 'BITMAP' in line:
-            # read bbh lines of widthbytes bitmap data
-            bitmap = []
-            for line in f:
-                # end of glyph data
-                if 'ENDCHAR' in line:
-                    glyph['BITMAP'] = bitmap
-                    glyphdata.append(glyph)
-                    break
-                # collect bitmap data
-                else:
-                    bitmap.append(int(line.rstrip('\n '), 16))
-
-    f.close()
-
-    # we don't need bdfdata anymore
-    os.system('rm -f bdfdata')
-
-    # ---------------------------------
-    if DEBUG_OUT:
+    except BdfError as e:
         print('')
-        print('version:', version)
-        print('point size:', point_size)
-        print('bounding box:', fbbx, fbby, xoff, yoff)
-        print('family name:', family_name)
-        print('weight name:', weight_name)
-        print('slant:', slant)
-        print('setwidth name:', setwidth_name)
-        print('add style name:', addstyle_name)
-        print('pixel size:', pixel_size)
-        print('spacing:', spacing)
-        for glyph in glyphdata:
-            print('glyph: ', glyph)
-
-    # ---------------------------------
-    # prepare header string
-    header = []
-    header.append('/*\n')
-    header.append(' * Font Information\n')
-    header.append(' *\n')
-    header.append(' *\tfont source: {}\n'.format(fname[fname.rfind('/')+1:]))
-    header.append(' *\tfamily name: {}\n'.format(family_name))
-    header.append(' *\tweight name: {}\n'.format(weight_name))
-    header.append(' *\tslant: {}\n'.format(slant))
-    header.append(' *\tsetwidth name: {}\n'.format(setwidth_name))
-    if addstyle_name in vars():
-        header.append(' *\taddstyle name: {}\n'.format(addstyle_name))
-    header.append(' *\tpoint size: {}\n'.format(point_size))
-    header.append(' *\tbounding box: ({},{})\n'.format(fbbx,fbby))
-    header.append(' *\tdata format: {}\n'.format(ftype))
-    header.append(' */\n\n')
-
-    # ---------------------------------
-    # build glyph data array
-    #
-    widthbytes = (fbbx + 7) // 8
-    for g in glyphdata:
-
-        hdata = []
-
-        # aliasing
-        bbw = g['BBX'][0]
-        bbh = g['BBX'][1]
-        dwidth = g['DWIDTH']
-        bitmap = g['BITMAP']
-
-        # x margin in pixel from the leftmost position
-        px_v = -xoff + g['BBX'][2]
-        # y margin in pixel from the topmost position
-        px_h = fbby + yoff - g['BBX'][3] - bbh
-
-        # actual glyph width
-        hdata.append(max(dwidth, px_v + bbw))
-
-        # fill the leading horizontal blank lines
-        idx = 0
-        while idx < px_h:
-            for l in range(widthbytes):
-                hdata.append(0)
-            idx = idx + 1
-
-        # determine the width of glyph data
-        if bbw <= 8:
-            k = 24
-        elif bbw <= 16:
-            k = 16
-        elif bbw <= 24:
-            k = 8
-        elif bbw <= 32:
-            k = 0
-        else:
-            print('Error: glyph data is too big. BBw = {}.\n'.format(bbw))
-
-        # fill glyph data
-        for j in range(bbh):
-            # align data to the leftmost position of 32bit
-            bitmap[j] = bitmap[j] << k
-            # compensate leading zero columns
-            bitmap[j] = bitmap[j] >> px_v
-
-            for l in range(widthbytes):
-                hdata.append((bitmap[j]>>(8*(3-l))) & 0xff)
-
-            idx = idx + 1
-
-        # fill trailing zero
-        while idx < fbby:
-            for l in range(widthbytes):
-                hdata.append(0)
-            idx = idx + 1
-
-        # attach to the glyph dictionary
-        g['HDATA'] = hdata
-
-    # ---------------------------------
-    # horizontal format glyph data
-    #
-    if ftype == 'horizontal':
-
-        # build font filename
-        fname = family_name + ' ' + weight_name
-        if slant == 'I':
-            fname = fname + ' Italic'
-        if addstyle_name != '':
-            fname = fname + ' ' + addstyle_name
-        fname = fname.replace(' ', '_')
-        fname = fname + '_' + str(point_size)
-
-        # create output directory if necessary
-        if not os.path.exists(DEFAULT_OUTPUT_DIR):
-            os.makedirs(DEFAULT_OUTPUT_DIR)
-
-        f = open(DEFAULT_OUTPUT_DIR + '/' + fname + '.h', 'w')
-
-        # augment header
-        header.append('#ifndef __{}_H_\n'.format(fname.upper()))
-        header.append('#define __{}_H_\n\n'.format(fname.upper()))
-        header.append('#include "lcd_font.h"\n\n')
-        header.append('const uint8_t {}[] =\n'.format(fname.lower() + '_glyph'))
-        header.append('{\n')
-
-        # write header part
-        f.writelines(header)
-
-        code = start_ch
-        for g in glyphdata:
-            data = g['HDATA']
-            f.write('\t')
-            for x in data:
-                f.write('0x{:02x},'.format(x))
-            f.write(' // \'{:c}\'\n'.format(code))
-            code = code + 1
-
-        f.write('};\n\n')
-        f.write('lcd_font {} = \n'.format(fname))
-        f.write('{\n')
-        f.write('\t{},\n'.format(widthbytes))
-        f.write('\t{},\n'.format(fbby))
-        f.write('\t\'{:c}\',\n'.format(start_ch))
-        f.write('\t\'{:c}\',\n'.format(end_ch))
-        f.write('\t{},\n'.format(fname.lower() + '_glyph'))
-        f.write('};\n\n')
-        f.write('#endif // __{}_H_'.format(fname.upper()))
-
-        f.close()
+        print('> Unsupported BDF file format:', e)
+        print('')
+        return False
 
-    # ---------------------------------
-    # vertical format glyph data for Epson SED 1520 compatible controller
-    # font data array should be rotated
+    # compare the compact glyph data with what the padded format would take
+    if compact:
+        name = packed.name(suffix)
+        codes = glyphs.codes
+        padded = (1 + packed.bytesper * packed.lines) * (len(codes)
+                if is_dense(codes) else len(glyphs))
+        if not is_dense(codes):
+            padded += RANGE_SIZE * len(packed.ranges)
+        size = packed.size()
+        print('> {}: {} bytes {}, {} bytes padded, {} bytes ({:.1f}%) '
+                'saved'.format(name, size, 'rle' if rle else 'compact',
+                padded, padded - size, 100.0 * (padded - size) / padded))
+    if rle:
+        stats = rle_stats(packed.metrics, packed.bitmaps, packed.raw)
+        print('> {}: compression ratio {:.2f} ({} of {} bitmap bytes), '
+                'decode {:.1f} byte reads per glyph ({:.1f} unencoded, '
+                '{:.1f} pixels)'.format(name, stats['ratio'], stats['size'],
+                stats['raw_size'], stats['reads'], stats['raw_reads'],
+                stats['pixels']))
+
+    if oformat == 'header':
+        files = emit_header(packed, suffix, split)
     else:
+        files = EMITTERS[oformat](packed, suffix)
+    metrics.lap('format')
 
-        heightbytes = (fbby + 7) // 8
-        if heightbytes > 4:
-            print('The font size is too big... Exiting...\n')
-            return;
-
-        for g in glyphdata:
-            # skip the glyph width byte
-            hdata = g['HDATA'][1:]
-
-            # create numpy array of size: (heightbytes*8, widthbytes*8)
-            # note that the sizes of axis must be multiple of 8 in both axes
-            npbmp = np.zeros((heightbytes*8, widthbytes*8), dtype = np.bool)
-            # top area must be filled with blank data
-            offset = npbmp.shape[0] - fbby
-
-            # idx1 is glyph height
-            for idx1 in range(fbby):
-                for idx2 in range(widthbytes):
-                    for idx3 in range(8):
-                        npbmp[idx1 + offset, idx2*8 + idx3] = (
-                                hdata[idx1*widthbytes + idx2] & 1<<(7-idx3)
-                                == 1<<(7-idx3))
-
-            # now collect data vertically
-            vdata = []
-            # glyph width must be the same
-            vdata.append(g['HDATA'][0])
-
-            for idx1 in range(fbbx):
-                for idx2 in range(heightbytes):
-                    x = 0
-                    for idx3 in range(8):
-                        if npbmp[idx2 * 8 + idx3,idx1]:
-                            x = x +  (1<<(idx3))
-
-                    vdata.append(x)
-
-            g['VDATA'] = vdata
-
-        # now ready to write file
-
-        # build font filename
-        fname = family_name + ' ' + weight_name
-        if slant == 'I':
-            fname = fname + ' Italic'
-        if addstyle_name != '':
-            fname = fname + ' ' + addstyle_name
-        fname = fname.replace(' ', '_')
-        fname = fname + '_' + str(point_size) + 'V'
-
-        f = open(DEFAULT_OUTPUT_DIR + '/' + fname + '.h', 'w')
-
-        # augment header
-        header.append('#ifndef __{}_H_\n'.format(fname.upper()))
-        header.append('#define __{}_H_\n\n'.format(fname.upper()))
-        header.append('#include "lcd_font.h"\n\n')
-        header.append('const uint8_t {}[] =\n'.format(fname.lower() + '_glyph'))
-        header.append('{\n')
-
-        # write header part
-        f.writelines(header)
-
-        code = start_ch
-        for g in glyphdata:
-            data = g['VDATA']
-            f.write('\t')
-            for x in data:
-                f.write('0x{:02x},'.format(x))
-            f.write(' // \'{:c}\'\n'.format(code))
-            code = code + 1
+    # ---------------------------------
+    # write files unless unchanged and remember the result
+    if cache is not None:
+        cache.put(out_key, files)
+        metrics.lap('cache')
 
-        f.write('};\n\n')
-        f.write('lcd_font_v {} = \n'.format(fname))
-        f.write('{\n')
-        f.write('\t{},\n'.format(heightbytes))
-        f.write('\t{},\n'.format(fbbx))
-        f.write('\t\'{:c}\',\n'.format(start_ch))
-        f.write('\t\'{:c}\',\n'.format(end_ch))
-        f.write('\t{},\n'.format(fname.lower() + '_glyph'))
-        f.write('};\n\n')
-        f.write('#endif // __{}_H_'.format(fname.upper()))
+    paths = write_files(files, outdir)
+    metrics.info['files'] = paths
+    metrics.count('output_bytes', sum(os.path.getsize(p) for p in paths))
+    metrics.lap('write')
 
-        f.close()
+    return paths[0]
 
 #--------1---------2---------3---------4---------5---------6---------7---------8
 if __name__ == '__main__':
 
-    # enumerate the font files in the FONT_DIR
-    flist = glob(DEFAULT_FONT_DIR + '/*.ttf')
-    flist.extend(glob(DEFAULT_FONT_DIR + '/*.otf'))
+    import argparse
+    import sys
+    import time
+    from batch import build_jobs, print_summary, run_batch
+    from layout import LAYOUTS
+    from manifest import Manifest, watch
+    from rasterizer import RASTERIZERS
+
+    # validate a character set argument but keep it as given
+    def charset_arg(text):
+        parse_charset(text)
+        return text
+
+    parser = argparse.ArgumentParser(
+            description='Convert desktop fonts into LCD font files.')
+    parser.add_argument('fonts', nargs='*',
+            help='font files, default: every otf/ttf in ' + DEFAULT_FONT_DIR)
+    parser.add_argument('-s', '--size', type=int, nargs='+',
+            default=[DEFAULT_POINT_SIZE], help='font sizes in pixel unit')
+    parser.add_argument('-t', '--type', nargs='+',
+            choices=sorted(LAYOUTS),
+            default=[DEFAULT_OUTPUT_TYPE], help='glyph data layouts')
+    parser.add_argument('-r', '--range', type=charset_arg, nargs='+',
+            help='character sets, e.g. 0x20-0x7e or "0x20-0xff,Greek", '
+            'default: 0x{:02x}-0x{:02x}'.format(DEFAULT_START_CHAR,
+                    DEFAULT_END_CHAR))
+    parser.add_argument('--subset', nargs='+', metavar='FILE',
+            help='convert only the characters used by the strings of C '
+            'sources, .po or .json files, plus those of -r and --chars')
+    parser.add_argument('--chars',
+            help='convert only these characters, plus those of --subset '
+            'and -r')
+    parser.add_argument('-f', '--format', choices=sorted(EMITTERS),
+            default=DEFAULT_OUTPUT_FORMAT, help='output file format')
+    parser.add_argument('-c', '--compact', action='store_true',
+            help='crop glyphs to their ink, see lcd_font_compact')
+    parser.add_argument('--colors', type=lambda x: int(x, 0), nargs=2,
+            metavar=('FG', 'BG'), help='RGB565 colors of the rgb565 layout')
+    parser.add_argument('--rle', action='store_true',
+            help='run-length encode the cropped glyphs, implies --compact')
+    parser.add_argument('--split', type=int, default=DEFAULT_SPLIT,
+            metavar='N', help='write at most N glyphs per C array, in one '
+            'header per array')
+    parser.add_argument('--memory-limit', type=int, metavar='MB',
+            default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+            help='approximate memory ceiling of glyph rendering per job')
+    parser.add_argument('--bundle', metavar='NAME',
+            help='convert all fonts into one header NAME.h that shares '
+            'identical glyphs, implies --compact')
+    parser.add_argument('-b', '--backend', default=DEFAULT_RASTERIZER,
+            choices=sorted(RASTERIZERS), help='rasterizer backend')
+    parser.add_argument('--no-cache', action='store_true',
+            help='bypass the conversion cache')
+    parser.add_argument('--purge-cache', action='store_true',
+            help='empty the conversion cache first')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+            help='parallel jobs, 0 for one per CPU')
+    parser.add_argument('-o', '--outdir', default=DEFAULT_OUTPUT_DIR,
+            help='output directory')
+    parser.add_argument('--metrics', metavar='FILE',
+            help='write the stage timings and counters of every job as JSON')
+    parser.add_argument('--trace-memory', action='store_true',
+            help='add the peak memory of every stage to the metrics')
+    parser.add_argument('--profile', action='store_true',
+            help='add the top functions of a cProfile run of every job to '
+            'the metrics')
+    parser.add_argument('--incremental', action='store_true',
+            help='convert only what changed since the last run and remove '
+            'the files of deleted fonts, see manifest.py')
+    parser.add_argument('--watch', action='store_true',
+            help='keep running and convert incrementally whenever the fonts '
+            'or the --subset files change')
+    args = parser.parse_args()
+
+    if args.purge_cache:
+        Cache().purge()
+
+    if args.bundle and (args.incremental or args.watch):
+        parser.error('--incremental and --watch do not apply to --bundle')
+
+    # font files of the FONT_DIR unless given
+    def font_files():
+        if args.fonts:
+            return list(args.fonts)
+        flist = glob(DEFAULT_FONT_DIR + '/*.ttf')
+        flist.extend(glob(DEFAULT_FONT_DIR + '/*.otf'))
+        return sorted(flist)
 
-    if len(flist) == 0:
-        print('')
-        print('> No font file (otf,ttf) found in ', DEFAULT_FONT_DIR)
-        print('> Copy font file of your choice into the folder.')
-        print('')
-    else:
-        # convert each font into lcd font with default setting
-        for f in flist :
-            generate_font_file(f)
+    #
+    # Jobs of every combination of font, size, type and range, or None after
+    # printing the reason. Built again on every rebuild of --watch, as the
+    # fonts and the strings of --subset may have changed.
+    #
+    def make_jobs():
+        # character sets, or a single subset of the characters in use
+        charsets = args.range or ['0x{:02x}-0x{:02x}'.format(
+                DEFAULT_START_CHAR, DEFAULT_END_CHAR)]
+        if args.subset or args.chars:
+            try:
+                codes = set(collect_codes(args.subset or (),
+                        args.chars or ''))
+            except (IOError, ValueError) as e:
+                print('')
+                print('> Cannot read the strings:', e)
+                print('')
+                return None
+            for chars in args.range or ():
+                codes.update(parse_charset(chars))
+            if len(codes) == 0:
+                print('')
+                print('> No character found in the strings')
+                print('')
+                return None
+            charsets = [charset_spec(sorted(codes))]
+            print('> subset of {} characters'.format(len(codes)))
+
+        flist = font_files()
+        if len(flist) == 0:
+            print('')
+            print('> No font file (otf,ttf) found in ', DEFAULT_FONT_DIR)
+            print('> Copy font file of your choice into the folder.')
+            print('')
+        return build_jobs(flist, args.size, args.type, charsets)
+
+    #
+    # Convert the jobs, with --incremental and --watch only those whose
+    # files are out of date, see manifest.py.
+    #
+    def convert(jobs):
+        manifest = None
+        if args.incremental or args.watch:
+            manifest = Manifest(args.outdir, (args.backend, args.format,
+                    args.compact or args.rle, args.rle, args.colors,
+                    args.split))
+            for path in manifest.prune():
+                print('> removed', path)
+            total = len(jobs)
+            jobs = manifest.stale(jobs)
+            print('> {} of {} targets out of date'.format(len(jobs), total))
+
+        start = time.time()
+        results = run_batch(jobs, args.jobs, args.outdir, args.backend,
+                args.format, args.compact, args.rle, args.colors,
+                args.split, args.memory_limit * 1024 * 1024,
+                not args.no_cache, args.trace_memory, args.profile)
+        elapsed = time.time() - start
+        if jobs:
+            print_summary(results, elapsed)
+
+        if manifest is not None:
+            for r in results:
+                if r.output and r.metrics:
+                    manifest.record(r.job, r.metrics['info'].get('files',
+                            [r.output]))
+            manifest.save()
+        if args.metrics:
+            from metrics import write_metrics
+            write_metrics(args.metrics, results, elapsed, GENERATOR_VERSION)
+            print('> metrics written to', args.metrics)
+
+    jobs = make_jobs()
+    if jobs is None:
+        sys.exit(1)
+    if args.bundle:
+        if jobs:
+            from bundle import generate_bundle
+            generate_bundle(jobs, args.bundle, args.outdir, args.backend,
+                    args.rle, not args.no_cache)
+    elif jobs or args.watch:
+        convert(jobs)
+
+    if args.watch:
+        def rebuild():
+            jobs = make_jobs()
+            if jobs is not None:
+                convert(jobs)
+            print('> watching, Ctrl-C to stop')
+
+        print('> watching, Ctrl-C to stop')
+        try:
+            watch(lambda: font_files() + list(args.subset or ()), rebuild)
+        except KeyboardInterrupt:
+            print('')
+            print('> watch stopped')
 
 #--------1---------2---------3---------4---------5---------6---------7---------8
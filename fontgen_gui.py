@@ -6,12 +6,53 @@ LOREM_IPSUM = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. \
 Donec varius lobortis ligula. Suspendisse a accumsan tortor, eget lictus \
 metus. Suspendisse mollis consequat sem ultrices porta. Aenean ante massa, \
 hendreit maximus gravida a, varius a sapiel.'
+# milliseconds of quiet before the sample and the preview are updated
+PREVIEW_DELAY = 200
+# screen pixels per LCD pixel of the preview
+PREVIEW_ZOOM = 3
 
-import matplotlib.font_manager as fm
-import warnings
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
 import wx
 
-from fontgen import *
+from fontindex import FontIndex
+from preview import LCD_OFF, LruCache, preview_font, render_text, zoom_pixels
+from worker import JobQueue
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+class PreviewPanel(wx.Panel):
+    def __init__(self, parent, zoom=PREVIEW_ZOOM):
+        wx.Panel.__init__(self, parent, -1, size=(300,150))
+        self.zoom = zoom
+        self.bitmap = None
+        self.message = ''
+        self.SetBackgroundColour(wx.Colour(*LCD_OFF))
+        self.Bind(wx.EVT_PAINT, self.OnPaint)
+
+    # number of LCD pixels that fit the panel width
+    def GetColumns(self):
+        return max(1, (self.GetClientSize().width - 8) // self.zoom)
+
+    # show a bool array from preview.render_text()
+    def SetImage(self, image):
+        rgb = zoom_pixels(image, self.zoom)
+        height, width = rgb.shape[:2]
+        self.bitmap = wx.Bitmap.FromBuffer(width, height, rgb.tobytes())
+        self.message = ''
+        self.Refresh()
+
+    def SetMessage(self, message):
+        self.bitmap = None
+        self.message = message
+        self.Refresh()
+
+    def OnPaint(self, evt):
+        dc = wx.PaintDC(self)
+        if self.bitmap is not None:
+            dc.DrawBitmap(self.bitmap, 4, 4)
+        elif self.message:
+            dc.DrawText(self.message, 4, 4)
 
 #--------1---------2---------3---------4---------5---------6---------7---------8
 class MyFrame(wx.Frame):
@@ -20,9 +61,10 @@ class MyFrame(wx.Frame):
 
         # font list
         self.lblFonts = wx.StaticText(self, wx.ID_ANY, "Font Family")
-        e = wx.FontEnumerator()
-        e.EnumerateFacenames()
-        flist = e.GetFacenames()
+        # families of the convertible font files, from the index of the
+        # last run; the index is refreshed in the background
+        self.fontindex = FontIndex()
+        flist = self.fontindex.family_names()
         self.lbxFonts = wx.ListBox(self, -1, wx.DefaultPosition, (300,100),
                 flist, wx.LB_SINGLE)
         # family
@@ -48,11 +90,21 @@ class MyFrame(wx.Frame):
         # point size
         self.lblPntSize = wx.StaticText(self, -1, "Point Size")
         self.spnPntSize = wx.SpinCtrl(self, -1, min=8, max=24, initial=10)
-        # generate
+        # generate, every click queues the current selection
         self.btnGenFont = wx.Button(self, -1, "Generate LCD Font")
+        self.btnCancel = wx.Button(self, -1, "Cancel")
+        self.btnCancel.Disable()
+        # progress of the queued jobs
+        self.gauProgress = wx.Gauge(self, -1, 100)
+        self.lstJobs = wx.ListCtrl(self, -1, size=(300,100),
+                style=wx.LC_REPORT|wx.LC_SINGLE_SEL)
+        for idx, title in enumerate(['Font', 'Direction', 'Size', 'Status']):
+            self.lstJobs.InsertColumn(idx, title)
         # sample
         self.txtLorem = wx.TextCtrl(self, -1, LOREM_IPSUM,
                 style=wx.TE_READONLY|wx.TE_MULTILINE)
+        # the sample as the LCD shows it
+        self.pnlPreview = PreviewPanel(self)
 
         self.__set_properties()
         self.__do_layout()
@@ -84,6 +136,9 @@ class MyFrame(wx.Frame):
         sizer_rhs.Add(sizer_g, 0, wx.EXPAND, 0)
         sizer_rhs.Add((20,20))
         sizer_rhs.Add(self.btnGenFont, 0, wx.ALL | wx.EXPAND, 4)
+        sizer_rhs.Add(self.btnCancel, 0, wx.ALL | wx.EXPAND, 4)
+        sizer_rhs.Add(self.gauProgress, 0, wx.ALL | wx.EXPAND, 4)
+        sizer_rhs.Add(self.lstJobs, 1, wx.ALL | wx.EXPAND, 4)
 
         sizer_h = wx.BoxSizer(wx.HORIZONTAL)
         sizer_h.Add(sizer_lhs, 0, wx.ALL | wx.EXPAND, 4)
@@ -92,6 +147,7 @@ class MyFrame(wx.Frame):
         sizer_v = wx.BoxSizer(wx.VERTICAL)
         sizer_v.Add(sizer_h, 1, wx.ALL|wx.EXPAND, 4)
         sizer_v.Add(self.txtLorem, 1, wx.ALL|wx.EXPAND, 4)
+        sizer_v.Add(self.pnlPreview, 1, wx.ALL|wx.EXPAND, 4)
 
         self.SetSizer(sizer_v)
         sizer_v.Fit(self)
@@ -103,29 +159,106 @@ class MyFrame(wx.Frame):
         self.Bind(wx.EVT_CHOICE, self.OnChangeFont, self.choFamily)
         self.Bind(wx.EVT_CHOICE, self.OnChangeFont, self.choStyle)
         self.Bind(wx.EVT_CHOICE, self.OnChangeFont, self.choWeight)
+        self.Bind(wx.EVT_CHOICE, self.OnChangeFont, self.choFontDir)
         self.Bind(wx.EVT_SPINCTRL, self.OnChangeFont, self.spnPntSize)
+        self.pnlPreview.Bind(wx.EVT_SIZE, self.OnResizePreview)
         self.Bind(wx.EVT_BUTTON, self.OnGenerateFont, self.btnGenFont)
+        self.Bind(wx.EVT_BUTTON, self.OnCancel, self.btnCancel)
+        self.Bind(wx.EVT_CLOSE, self.OnClose)
 
-        # promote UserWarning as error
-        warnings.filterwarnings('error')
         # default font file name
         self.fontfname = None
+        # conversions run on worker threads, their callbacks on this one
+        self.jobs = JobQueue(notify=wx.CallAfter)
+        # list row and progress of every job, and the jobs done since the
+        # queue was last empty
+        self.jobrows = {}
+        self.jobprogress = {}
+        self.jobsdone = set()
+        # previews render on a thread of their own from recently packed
+        # fonts; only the latest request is shown
+        self.previews = LruCache()
+        self.previewpool = ThreadPoolExecutor(max_workers=1)
+        self.previewid = 0
+        # pending update of the sample, restarted by every change
+        self.updatetimer = None
+        # pick up fonts installed or removed since the last run
+        threading.Thread(target=self.RefreshFonts, daemon=True).start()
 
     def OnSelectFont(self, evt=None):
-        self.UpdateSample()
+        self.ScheduleUpdate()
 
     def OnChangeFont(self, evt=None):
-        self.UpdateSample()
+        self.ScheduleUpdate()
+
+    def OnResizePreview(self, evt):
+        evt.Skip()
+        if self.fontfname is not None:
+            self.ScheduleUpdate()
+
+    # update the sample once the selection has been left alone for a moment,
+    # so that scrubbing through sizes does not render every one of them
+    def ScheduleUpdate(self):
+        if self.updatetimer is not None and self.updatetimer.IsRunning():
+            self.updatetimer.Restart(PREVIEW_DELAY)
+        else:
+            self.updatetimer = wx.CallLater(PREVIEW_DELAY, self.UpdateSample)
 
     def OnGenerateFont(self, evt=None):
         if self.fontfname is None:
             wx.MessageBox('Select a font first.')
             return
         else:
-            generate_font_file(self.fontfname,
-                    ftype = self.choFontDir.GetStringSelection().lower(),
-                    psize = self.spnPntSize.GetValue())
+            ftype = self.choFontDir.GetStringSelection().lower()
+            psize = self.spnPntSize.GetValue()
+            ident = self.jobs.submit(self.fontfname,
+                    on_progress = self.OnJobProgress,
+                    on_done = self.OnJobDone,
+                    ftype = ftype,
+                    psize = psize)
+
+            row = self.lstJobs.GetItemCount()
+            self.lstJobs.InsertItem(row, os.path.basename(self.fontfname))
+            self.lstJobs.SetItem(row, 1, ftype)
+            self.lstJobs.SetItem(row, 2, str(psize))
+            self.lstJobs.SetItem(row, 3, 'queued')
+            self.jobrows[ident] = row
+            self.jobprogress[ident] = 0.0
+            self.btnCancel.Enable()
+            self.UpdateProgress()
+
+    def OnCancel(self, evt=None):
+        self.jobs.cancel()
+
+    def OnClose(self, evt):
+        self.jobs.shutdown()
+        self.previewpool.shutdown(wait=False)
+        evt.Skip()
 
+    def OnJobProgress(self, ident, done, total):
+        self.jobprogress[ident] = float(done) / total if total else 1.0
+        self.lstJobs.SetItem(self.jobrows[ident], 3,
+                '{:.0f}%'.format(100 * self.jobprogress[ident]))
+        self.UpdateProgress()
+
+    def OnJobDone(self, ident, output, error):
+        self.jobprogress[ident] = 1.0
+        self.jobsdone.add(ident)
+        self.lstJobs.SetItem(self.jobrows[ident], 3,
+                error or os.path.basename(output))
+        self.UpdateProgress()
+        # the last job is done once its own callback has run here, the queue
+        # empties earlier while callbacks are still on their way
+        if self.jobsdone.issuperset(self.jobprogress):
+            self.btnCancel.Disable()
+            self.jobprogress = {}
+            self.jobsdone = set()
+
+    # overall progress of the jobs since the queue was last empty
+    def UpdateProgress(self):
+        if self.jobprogress:
+            self.gauProgress.SetValue(int(100 * sum(self.jobprogress.values())
+                    / len(self.jobprogress)))
 
     def UpdateSample(self):
         # face name
@@ -172,14 +305,12 @@ class MyFrame(wx.Frame):
         # point size
         psize = self.spnPntSize.GetValue()
 
-        # find the font file using matplotlib.font_manager
-        mfont = fm.FontProperties(family=face,style=style,weight=weight)
-        try:
-            self.fontfname = fm.findfont(mfont)
-        except UserWarning:
-            #wx.MessageBox("TTF/OTF file for \'{}\' are not found.".format(face))
+        # find the font file in the index
+        self.fontfname = self.fontindex.find(face, weight, style)
+        if self.fontfname is None:
             self.btnGenFont.Disable()
-            self.fontfname = None
+            self.pnlPreview.SetMessage(
+                    'No TTF/OTF file found for \'{}\''.format(face))
             return
         else:
             self.btnGenFont.Enable()
@@ -189,6 +320,51 @@ class MyFrame(wx.Frame):
             # redraw the sample text
             self.txtLorem.SetLabel(LOREM_IPSUM);
             self.txtLorem.SetFont(font);
+            self.StartPreview()
+
+    # runs on a thread of its own
+    def RefreshFonts(self):
+        try:
+            self.fontindex.refresh()
+        except (IOError, OSError):
+            # keep the index of the last run
+            return
+        wx.CallAfter(self.UpdateFontList)
+
+    def UpdateFontList(self):
+        face = self.lbxFonts.GetStringSelection()
+        names = self.fontindex.family_names()
+        self.lbxFonts.Set(names)
+        if face in names:
+            self.lbxFonts.SetStringSelection(face)
+
+    def StartPreview(self):
+        self.previewid += 1
+        self.previewpool.submit(self.RenderPreview, self.previewid,
+                self.fontfname, self.spnPntSize.GetValue(),
+                self.choFontDir.GetStringSelection().lower(),
+                self.pnlPreview.GetColumns())
+
+    # runs on the preview thread
+    def RenderPreview(self, ident, fname, psize, ftype, columns):
+        # skip requests superseded while queued
+        if ident != self.previewid:
+            return
+        try:
+            packed = preview_font(fname, psize, ftype, cache=self.previews)
+            image = render_text(packed, LOREM_IPSUM, columns)
+        except Exception as e:
+            wx.CallAfter(self.ShowPreview, ident, None, str(e))
+        else:
+            wx.CallAfter(self.ShowPreview, ident, image, None)
+
+    def ShowPreview(self, ident, image, error):
+        if ident != self.previewid:
+            return
+        if error is not None:
+            self.pnlPreview.SetMessage(error)
+        else:
+            self.pnlPreview.SetImage(image)
 
 
 #--------1---------2---------3---------4---------5---------6---------7---------8
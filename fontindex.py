@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+#
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+from settings import *
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Persistent index of the convertible fonts of the system, face to file.
+#
+# The index lists every TTF and OTF file under FONT_DIRS with the family,
+# style, weight and slant read from its name and OS/2 tables. It is stored as
+# JSON and refreshed incrementally: a directory whose mtime is unchanged is not
+# listed again, and a file whose mtime and size are unchanged is not read
+# again, so a refresh stats the directories and the font files but reads only
+# new or changed files.
+#
+# Font collections and other formats are left out, as they cannot be
+# converted.
+#
+FONT_DIRS = [
+    DEFAULT_FONT_DIR,
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    '~/.local/share/fonts',
+    '~/.fonts',
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+    '~/Library/Fonts',
+]
+if sys.platform.startswith('win'):
+    FONT_DIRS.append(os.path.join(os.environ.get('WINDIR', 'C:\\Windows'),
+            'Fonts'))
+
+FONT_EXTENSIONS = ('.ttf', '.otf')
+
+# bump when the index format changes, older indexes are rebuilt
+INDEX_VERSION = 1
+
+# weights of the GUI weight names, see find()
+WEIGHTS = {'light': 300, 'normal': 400, 'bold': 700}
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Decoded string of a name table record.
+#
+def _decode_name(platform, data):
+    if platform in (0, 3):
+        return data.decode('utf-16-be', 'replace')
+    return data.decode('mac_roman', 'replace')
+
+#
+# Face of a TTF or OTF file.
+#
+# Returns {'family', 'style', 'weight', 'italic'} or None for files that are
+# not single face TrueType or OpenType fonts. The typographic family and
+# subfamily are preferred over the legacy ones, which split weights into
+# families of their own.
+#
+def read_face(fname):
+    with open(fname, 'rb') as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] not in (b'\x00\x01\x00\x00', b'OTTO',
+                b'true'):
+            return None
+        count = struct.unpack('>H', head[4:6])[0]
+        tables = {}
+        directory = f.read(16 * count)
+        for idx in range(len(directory) // 16):
+            tag, checksum, offset, length = struct.unpack_from('>4sIII',
+                    directory, 16 * idx)
+            tables[tag] = (offset, length)
+        if b'name' not in tables:
+            return None
+
+        offset, length = tables[b'name']
+        f.seek(offset)
+        table = f.read(length)
+        fmt, records, strings = struct.unpack_from('>HHH', table)
+        names = {}
+        for idx in range(records):
+            platform, encoding, language, name_id, size, pos = \
+                    struct.unpack_from('>HHHHHH', table, 6 + 12 * idx)
+            if name_id not in (1, 2, 16, 17) or platform not in (0, 1, 3):
+                continue
+            # Windows English first, then Unicode, then Macintosh
+            rank = (0 if (platform, language) == (3, 0x409) else
+                    1 if platform in (0, 3) else 2)
+            if name_id in names and names[name_id][0] <= rank:
+                continue
+            data = table[strings+pos:strings+pos+size]
+            names[name_id] = (rank, _decode_name(platform, data))
+
+        weight, selection = 0, 0
+        if b'OS/2' in tables and tables[b'OS/2'][1] >= 64:
+            f.seek(tables[b'OS/2'][0])
+            os2 = f.read(64)
+            weight = struct.unpack_from('>H', os2, 4)[0]
+            selection = struct.unpack_from('>H', os2, 62)[0]
+
+    family = names.get(16, names.get(1, (0, '')))[1].strip()
+    style = names.get(17, names.get(2, (0, 'Regular')))[1].strip()
+    if not family:
+        return None
+    lower = style.lower()
+    if not 1 <= weight <= 1000:
+        weight = 700 if 'bold' in lower else 300 if 'light' in lower else 400
+    # italic or oblique bit
+    italic = bool(selection & 0x201) or 'italic' in lower \
+            or 'oblique' in lower
+    return {'family': family, 'style': style, 'weight': weight,
+            'italic': italic}
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Index of the font files, see the top of this file.
+#
+#   path: index file
+#   dirs: directories to scan, FONT_DIRS by default
+#
+# The index file is loaded on the first lookup. refresh() scans the
+# directories and saves the index, and may run on another thread while the
+# old index answers lookups.
+#
+class FontIndex(object):
+
+    def __init__(self, path = DEFAULT_FONT_INDEX, dirs = None):
+        self.path = path
+        self.dirs = [os.path.expanduser(d) for d in (dirs or FONT_DIRS)]
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.index = {'version': INDEX_VERSION, 'dirs': {}, 'files': {}}
+        self.families = {}
+
+    def _load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            try:
+                with open(self.path) as f:
+                    index = json.load(f)
+                if index.get('version') == INDEX_VERSION:
+                    self.index = index
+            except (IOError, ValueError):
+                pass
+            self.families = self._families(self.index)
+            self.loaded = True
+
+    # faces by family, as lists of (face, path)
+    @staticmethod
+    def _families(index):
+        families = {}
+        for path, entry in index['files'].items():
+            face = entry['face']
+            if face is not None:
+                families.setdefault(face['family'], []).append((face, path))
+        return families
+
+    # sorted family names
+    def family_names(self):
+        self._load()
+        return sorted(self.families, key=str.lower)
+
+    #
+    # Font file of a face or None.
+    #
+    #   family: family name as given by family_names()
+    #   weight: 'light', 'normal', 'bold' or a weight class, e.g. 700
+    #   style: 'normal', 'italic' or 'oblique'
+    #
+    # The face closest to the weight with the same slant wins, any face of
+    # the family when none has the slant.
+    #
+    def find(self, family, weight = 'normal', style = 'normal'):
+        self._load()
+        faces = self.families.get(family)
+        if not faces:
+            return None
+        weight = WEIGHTS.get(weight, weight)
+        italic = style in ('italic', 'oblique')
+        face, path = min(faces, key=lambda x: (x[0]['italic'] != italic,
+                abs(x[0]['weight'] - weight), x[1]))
+        return path
+
+    #
+    # Scan the directories and save the index.
+    #
+    # Returns the number of font files read.
+    #
+    def refresh(self):
+        self._load()
+        old_dirs, old_files = self.index['dirs'], self.index['files']
+        dirs, files = {}, {}
+        read = 0
+
+        pending = [d for d in self.dirs if os.path.isdir(d)]
+        while pending:
+            dirname = pending.pop()
+            if dirname in dirs:
+                continue
+            try:
+                mtime = os.stat(dirname).st_mtime
+            except OSError:
+                continue
+            entry = old_dirs.get(dirname)
+            if entry is None or entry['mtime'] != mtime:
+                entry = {'mtime': mtime, 'fonts': [], 'subdirs': []}
+                try:
+                    names = sorted(os.listdir(dirname))
+                except OSError:
+                    names = []
+                for name in names:
+                    full = os.path.join(dirname, name)
+                    if os.path.isdir(full):
+                        entry['subdirs'].append(name)
+                    elif name.lower().endswith(FONT_EXTENSIONS):
+                        entry['fonts'].append(name)
+            dirs[dirname] = entry
+            pending.extend(os.path.join(dirname, name)
+                    for name in entry['subdirs'])
+
+            for name in entry['fonts']:
+                path = os.path.join(dirname, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                old = old_files.get(path)
+                if old is not None and old['mtime'] == st.st_mtime \
+                        and old['size'] == st.st_size:
+                    files[path] = old
+                    continue
+                try:
+                    face = read_face(path)
+                except (IOError, struct.error):
+                    face = None
+                files[path] = {'mtime': st.st_mtime, 'size': st.st_size,
+                        'face': face}
+                read += 1
+
+        index = {'version': INDEX_VERSION, 'dirs': dirs, 'files': files}
+        families = self._families(index)
+        with self.lock:
+            self.index, self.families = index, families
+        self.save()
+        return read
+
+    # write the index file atomically
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=dirname or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.index, f)
+            os.replace(tmpname, self.path)
+        except BaseException:
+            os.remove(tmpname)
+            raise
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+#
+import numpy as np
+from settings import *
+from cache import Cache, file_digest, make_key
+from charset import code_ranges, is_dense, parse_charset
+from emit import COMPACT_GLYPH_SIZE, RANGE_SIZE
+from fontbin import new_font_bin
+from bitmap import chunk_size, glyph_matrix, glyph_widths, pack_compact
+from layout import LayoutError, get_layout
+from metrics import Metrics
+from rasterizer import get_rasterizer
+from rle import encode_glyphs, verify_glyphs
+from subset import collect_codes
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Conversion in separate steps, without writing any file:
+#
+#   glyphs = load_font('fonts/my.ttf', 16, '0x20-0x7e,Greek')
+#   for ftype in ('horizontal', 'vertical'):
+#       packed = pack_font(glyphs, ftype)
+#       files = emit_header(packed)
+#
+# load_font() rasterizes once, so one glyph set can be packed into several
+# layouts. pack_font() returns the glyph data as numpy arrays or bytes, and
+# the emitters in emit.py turn it into file contents, {file name: contents}.
+# generate_font_file() in fontgen.py does all steps and writes the files.
+#
+# Failures raise FontGenError, layout.LayoutError, rasterizer.RasterizerError
+# or bdf.BdfError.
+#
+
+# part of every cache key, bump when the generated output changes
+GENERATOR_VERSION = '2026.10.2'
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Raised when a conversion cannot be done, e.g. for an empty character set.
+#
+class FontGenError(ValueError):
+    pass
+
+#
+# Raised by progress callbacks to stop a conversion.
+#
+class Cancelled(FontGenError):
+    pass
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Cache key of the rasterized glyph set of a font file.
+#
+def glyph_cache_key(digest, backend, psize, codes):
+    return make_key(GENERATOR_VERSION, digest, backend, psize, codes)
+
+#
+# Output name of a font, family and weight followed by the style, the point
+# size, the format tag and the suffix.
+#
+def font_name(font, tag = '', suffix = ''):
+    props = font.properties
+    fname = str(props.get('FAMILY_NAME', '')) + ' ' \
+            + str(props.get('WEIGHT_NAME', ''))
+    if str(props.get('SLANT', '')) == 'I':
+        fname = fname + ' Italic'
+    addstyle_name = str(props.get('ADD_STYLE_NAME', ''))
+    if addstyle_name != '':
+        fname = fname + ' ' + addstyle_name
+    fname = fname.replace(' ', '_')
+    return fname + '_' + str(font.point_size) + tag + suffix
+
+#
+# Character codes to convert.
+#
+#   chars: specification string or list of codes, see charset.parse_charset()
+#   sources: files whose strings give the characters, in addition to chars,
+#       see subset.py
+#   start_ch, end_ch: range used when neither chars nor sources are given
+#
+# Returns a sorted tuple of codes.
+#
+def select_codes(chars = None, sources = None,
+        start_ch = DEFAULT_START_CHAR,
+        end_ch = DEFAULT_END_CHAR):
+    if sources is not None:
+        try:
+            codes = collect_codes(sources)
+        except (IOError, ValueError) as e:
+            raise FontGenError('cannot read the strings: {}'.format(e))
+        if chars is not None:
+            codes = tuple(sorted(set(codes).union(parse_charset(chars))))
+    elif chars is not None:
+        codes = parse_charset(chars)
+    else:
+        codes = tuple(range(start_ch, end_ch + 1))
+    if len(codes) == 0:
+        raise FontGenError('empty character set')
+    return codes
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Rasterized glyphs of a font file.
+#
+#   fname: source font file
+#   psize: font size in pixel unit
+#   backend: rasterizer backend name
+#   codes: requested character codes, the font may lack some of them
+#   font: BdfFont of the glyphs the font has, in code order
+#
+class GlyphSet(object):
+
+    def __init__(self, fname, psize, backend, codes, font):
+        self.fname = fname
+        self.psize = psize
+        self.backend = backend
+        self.codes = codes
+        self.font = font
+
+    def __len__(self):
+        return len(self.font)
+
+    def name(self, tag = '', suffix = ''):
+        return font_name(self.font, tag, suffix)
+
+#
+# Rasterize the glyphs of a font.
+#
+#   fname: source font file, otf or ttf
+#   psize: font size in pixel unit
+#   chars, sources: character set, see select_codes(), by default the range
+#       DEFAULT_START_CHAR..DEFAULT_END_CHAR
+#   backend: rasterizer backend name, see rasterizer.py
+#   use_cache: reuse glyph sets from the conversion cache
+#   metrics: Metrics instance for the charset, cache and rasterize stages
+#
+# Returns a GlyphSet. Raises FontGenError when the font has no glyph of the
+# character set.
+#
+def load_font(fname,
+        psize = DEFAULT_POINT_SIZE,
+        chars = None,
+        sources = None,
+        backend = DEFAULT_RASTERIZER,
+        use_cache = USE_CACHE,
+        metrics = None):
+
+    if metrics is None:
+        metrics = Metrics()
+    codes = select_codes(chars, sources)
+    metrics.lap('charset')
+
+    cache = key = None
+    if use_cache:
+        try:
+            key = glyph_cache_key(file_digest(fname), backend, psize, codes)
+            cache = Cache()
+        except IOError:
+            # leave the error to the rasterizer
+            pass
+
+    font = cache.get(key) if cache is not None else None
+    metrics.lap('cache')
+    if font is None:
+        font = get_rasterizer(backend).rasterize(fname, psize, codes)
+        metrics.lap('rasterize')
+        if cache is not None:
+            cache.put(key, font)
+            metrics.lap('cache')
+
+    if len(font) == 0:
+        raise FontGenError('the font has no glyph of the character set')
+    metrics.count('codes', len(codes))
+    metrics.count('glyphs', len(font))
+    return GlyphSet(fname, psize, backend, codes, font)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Glyph data of a font in one layout.
+#
+#   glyphs: the GlyphSet
+#   layout: Layout instance, see layout.py
+#   ftype: layout name
+#   compact, rle: glyphs are cropped, and run-length encoded
+#   tag: format tag of the output name
+#   struct_name: C struct of the font, see inc/lcd_font.h
+#   bytesper, lines: geometry of the layout, see Layout.geometry()
+#   codes: character code of every glyph
+#   ranges: code range table, see charset.code_ranges(), or None for one
+#       range of codes up to 0xff
+#   data: fixed size glyphs, uint8 array of shape (glyphs, 1 + bytesper *
+#       lines) holding the width and the glyph data, a view into blob when
+#       packed for a binary container. None for compact fonts.
+#   blob: binary container the data is packed in, see fontbin.new_font_bin()
+#   metrics: compact fonts, uint8 array of shape (glyphs, 5), see
+#       bitmap.pack_compact()
+#   bitmaps: compact fonts, list of the cropped, or encoded, bitmaps
+#   raw: rle fonts, list of the bitmaps before encoding
+#
+class PackedFont(object):
+
+    def __init__(self, glyphs, layout, ftype):
+        self.glyphs = glyphs
+        self.layout = layout
+        self.ftype = ftype
+        self.compact = self.rle = False
+        self.tag = layout.tag
+        self.struct_name = layout.struct_name
+        font = glyphs.font
+        self.bytesper, self.lines = layout.geometry(font.fbbx, font.fbby)
+        self.codes = self.ranges = None
+        self.data = self.blob = None
+        self.metrics = self.bitmaps = self.raw = None
+
+    def name(self, suffix = ''):
+        return self.glyphs.name(self.tag, suffix)
+
+    # bytes of the glyph data, range table included
+    def size(self):
+        ranges = len(self.ranges) * RANGE_SIZE if self.ranges else 0
+        if self.compact:
+            return sum(len(b) for b in self.bitmaps) \
+                    + COMPACT_GLYPH_SIZE * len(self.codes) + ranges
+        return self.data.nbytes + ranges
+
+#
+# Layout instance of a layout name, see layout.get_layout(). Raises
+# LayoutError for unknown layouts and compact forms a layout lacks.
+#
+def make_layout(ftype, compact = False, colors = None):
+    if colors is not None:
+        layout = get_layout(ftype, fg = colors[0], bg = colors[1])
+    else:
+        layout = get_layout(ftype)
+    if compact and not layout.compact:
+        raise LayoutError('the {} layout has no compact form'.format(ftype))
+    return layout
+
+#
+# Pack a glyph set into a layout.
+#
+#   glyphs: GlyphSet from load_font()
+#   ftype: glyph data layout, 'horizontal', 'vertical' or any other layout
+#       registered in layout.py
+#   compact: crop every glyph to its ink, see lcd_font_compact
+#   rle: run-length encode the cropped glyphs, see inc/lcd_font_rle.h
+#   colors: (fg, bg) RGB565 colors of the rgb565 layout
+#   binary: pack fixed size glyphs straight into a binary container, so that
+#       emit_binary() needs no copy
+#   memory_limit: approximate ceiling of the memory used to render and pack
+#       glyphs in bytes, see bitmap.chunk_size()
+#   metrics: Metrics instance for the matrix, pack and encode stages
+#   progress: progress(done, total) called with the number of glyphs packed
+#       after every chunk, it may raise Cancelled
+#
+# Returns a PackedFont.
+#
+# A single range of codes up to 0xff gets a blank glyph for every code the
+# font lacks. Any other character set, and every compact font, gets a range
+# table. Glyphs are rendered and packed in chunks so that large character
+# sets stay within the memory limit.
+#
+def pack_font(glyphs,
+        ftype = DEFAULT_OUTPUT_TYPE,
+        compact = False,
+        rle = False,
+        colors = None,
+        binary = False,
+        memory_limit = DEFAULT_MEMORY_LIMIT,
+        metrics = None,
+        progress = None):
+
+    if metrics is None:
+        metrics = Metrics()
+    compact = compact or rle
+    layout = make_layout(ftype, compact, colors)
+
+    font = glyphs.font
+    packed = PackedFont(glyphs, layout, ftype)
+    widths = glyph_widths(font)
+    step = chunk_size(font, memory_limit)
+    chunks = [(start, min(start + step, len(font)))
+            for start in range(0, len(font), step)]
+
+    if compact:
+        packed.compact, packed.rle = True, rle
+        packed.codes = list(font.encoding)
+        packed.ranges = code_ranges(packed.codes)
+        packed.metrics = np.zeros((len(font), 5), dtype=np.uint8)
+        packed.bitmaps = []
+        packed.raw = [] if rle else None
+        for start, stop in chunks:
+            matrix = glyph_matrix(font, start, stop)
+            metrics.lap('matrix')
+            m, b = pack_compact(matrix, widths[start:stop], layout.vertical)
+            packed.metrics[start:stop] = m
+            metrics.lap('pack')
+            if rle:
+                packed.raw.extend(b)
+                b = encode_glyphs(matrix, m, layout.vertical)
+                idx = verify_glyphs(matrix, m, b, layout.vertical)
+                metrics.lap('encode')
+                if idx >= 0:
+                    raise FontGenError('run-length encoding failed at code '
+                            + hex(font.encoding[start + idx]))
+            packed.bitmaps.extend(b)
+            if progress is not None:
+                progress(stop, len(font))
+        if rle:
+            packed.struct_name += '_rle'
+            packed.tag += 'R'
+        else:
+            packed.struct_name += '_compact'
+            packed.tag += 'C'
+        metrics.count('glyph_bytes', packed.metrics.nbytes
+                + sum(len(b) for b in packed.bitmaps))
+        return packed
+
+    # arrange glyphs by character code, a blank glyph for every code of a
+    # dense set the font lacks
+    codes = glyphs.codes
+    if is_dense(codes):
+        packed.codes = codes
+        rows = np.asarray(font.encoding, dtype=np.int64) - codes[0]
+    else:
+        packed.codes = list(font.encoding)
+        packed.ranges = code_ranges(packed.codes)
+        packed.struct_name += '_sparse'
+        rows = np.arange(len(font))
+
+    glyph_size = 1 + packed.bytesper * packed.lines
+    if binary:
+        packed.blob, packed.data = new_font_bin(len(packed.codes),
+                glyph_size, ftype, packed.bytesper, packed.lines,
+                packed.codes[0], packed.codes[-1], packed.ranges)
+    else:
+        packed.data = np.zeros((len(packed.codes), glyph_size),
+                dtype=np.uint8)
+    for start, stop in chunks:
+        matrix = glyph_matrix(font, start, stop)
+        metrics.lap('matrix')
+        packed.data[rows[start:stop]] = layout.pack(matrix,
+                widths[start:stop], font.fbbx)
+        metrics.lap('pack')
+        if progress is not None:
+            progress(stop, len(font))
+    metrics.count('glyph_bytes', packed.data.nbytes)
+    return packed
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -37,8 +37,8 @@ typedef struct _horizontal_raster_font
 {
 	int widthbytes;
 	int height;
-	char startcode;
-	char endcode;
+	uint8_t startcode;
+	uint8_t endcode;
 	const uint8_t *glyph;
 } lcd_font;
 
@@ -59,9 +59,198 @@ typedef struct _vertical_raster_font
 {
 	int heightbytes;
 	int width;
-	char startcode;
-	char endcode;
+	uint8_t startcode;
+	uint8_t endcode;
 	const uint8_t *glyph;
 } lcd_font_v;
 
+/*
+ * Other controller layouts
+ *
+ * fontgen.py can lay the glyph data out the way other controllers take it,
+ * so that glyphs can be sent to them as they are. The structs are the same,
+ * only the meaning of the glyph data differs.
+ *
+ *	horizontal-lsb: lcd_font with the leftmost pixel in the LSB
+ *	page: lcd_font_v for SSD1306, SH1106 and ST7565 type controllers. The
+ *		glyph is stored page by page, (first page) ... (heightbytes th
+ *		page), where each page is one byte per column for 8 rows with the
+ *		topmost pixel in the LSB.
+ *	page-msb: same as page with the topmost pixel in the MSB
+ *	rgb565: lcd_font with widthbytes being twice the width in pixels. Each
+ *		line holds one 16 bit RGB565 pixel per column, big-endian, in two
+ *		colors chosen at conversion time.
+ */
+
+/*
+ * Fonts with sparse character codes
+ *
+ * Codes beyond 0xff or glyph sets with gaps, for instance Latin-1 together
+ * with Greek and a few symbols, are described by a table of code ranges.
+ * Glyphs of all ranges are stored back to back in the glyph array.
+ *
+ *	startcode: first character code of the range
+ *	count: number of consecutive codes in the range
+ *	index: position of the first glyph of the range in the glyph array
+ *
+ * The table is sorted by startcode so that lcd_font_find() can do a binary
+ * search. The glyph data has the same format as in lcd_font and lcd_font_v,
+ * glyph number n starts at glyph + n * (1 + widthbytes * height) or
+ * glyph + n * (1 + heightbytes * width) respectively.
+ */
+
+typedef struct _font_range
+{
+	uint32_t startcode;
+	uint32_t count;
+	uint32_t index;
+} lcd_font_range;
+
+typedef struct _horizontal_raster_font_sparse
+{
+	int widthbytes;
+	int height;
+	int nranges;
+	const lcd_font_range *ranges;
+	const uint8_t *glyph;
+} lcd_font_sparse;
+
+typedef struct _vertical_raster_font_sparse
+{
+	int heightbytes;
+	int width;
+	int nranges;
+	const lcd_font_range *ranges;
+	const uint8_t *glyph;
+} lcd_font_v_sparse;
+
+/*
+ * Fonts split into several glyph arrays
+ *
+ * Large character sets such as CJK are written in several arrays of 'chunk'
+ * glyphs each, one header per array, since some compilers cannot handle a
+ * single huge array. The glyph data has the same format as in lcd_font and
+ * lcd_font_v and glyphs are looked up with lcd_font_find() as for sparse
+ * fonts, then with lcd_font_chunk_glyph().
+ */
+
+typedef struct _horizontal_raster_font_chunked
+{
+	int widthbytes;
+	int height;
+	int nranges;
+	const lcd_font_range *ranges;
+	int chunk;
+	const uint8_t *const *chunks;
+} lcd_font_chunked;
+
+typedef struct _vertical_raster_font_chunked
+{
+	int heightbytes;
+	int width;
+	int nranges;
+	const lcd_font_range *ranges;
+	int chunk;
+	const uint8_t *const *chunks;
+} lcd_font_v_chunked;
+
+/*
+ * Compact fonts
+ *
+ * Every glyph is cropped to its ink instead of being padded to the font
+ * bounding box, which saves most of the space for proportional fonts.
+ * Glyph number n, looked up with lcd_font_find(), is described by glyphs[n]:
+ *
+ *	offset: position of the glyph bitmap in data
+ *	width, height: size of the glyph bitmap in pixels
+ *	xoffset, yoffset: position of the glyph bitmap in the font bounding box,
+ *		from its top left corner
+ *	advance: distance to the next glyph in pixels
+ *
+ * lcd_font_compact bitmaps are height lines of (width + 7) / 8 bytes,
+ * leftmost pixel in the MSB. lcd_font_v_compact bitmaps are width columns of
+ * (height + 7) / 8 bytes, topmost pixel in the LSB. Blank glyphs such as the
+ * space have width and height of 0 and no bitmap bytes.
+ *
+ *	height: number of horizontal lines of the font bounding box
+ */
+
+typedef struct _compact_glyph
+{
+	uint32_t offset;
+	uint8_t width;
+	uint8_t height;
+	uint8_t xoffset;
+	uint8_t yoffset;
+	uint8_t advance;
+} lcd_glyph_compact;
+
+typedef struct _horizontal_raster_font_compact
+{
+	int height;
+	int nranges;
+	const lcd_font_range *ranges;
+	const lcd_glyph_compact *glyphs;
+	const uint8_t *data;
+} lcd_font_compact;
+
+typedef struct _vertical_raster_font_compact
+{
+	int height;
+	int nranges;
+	const lcd_font_range *ranges;
+	const lcd_glyph_compact *glyphs;
+	const uint8_t *data;
+} lcd_font_v_compact;
+
+/*
+ * Bitmap drawn on the host with a font, e.g. a whole screen or a text label,
+ * see render.py. The data has the byte order of the font layout: height
+ * lines of (width + 7) / 8 bytes, leftmost pixel in the MSB, for horizontal
+ * fonts, width columns of (height + 7) / 8 bytes, topmost pixel in the LSB,
+ * for vertical fonts. Blank bitmaps of no width have no data.
+ *
+ *	width, height: size of the bitmap in pixels
+ *	data: bitmap data, sent to the display as it is
+ */
+
+typedef struct _lcd_bitmap
+{
+	int width;
+	int height;
+	const uint8_t *data;
+} lcd_bitmap;
+
+/*
+ * Glyph number of a character code or -1 if the font does not have it.
+ */
+static inline int lcd_font_find(const lcd_font_range *ranges, int nranges,
+		uint32_t code)
+{
+	int lo = 0;
+	int hi = nranges - 1;
+
+	while (lo <= hi) {
+		int mid = (lo + hi) / 2;
+
+		if (code < ranges[mid].startcode)
+			hi = mid - 1;
+		else if (code - ranges[mid].startcode >= ranges[mid].count)
+			lo = mid + 1;
+		else
+			return ranges[mid].index + (code - ranges[mid].startcode);
+	}
+	return -1;
+}
+
+/*
+ * Glyph number n of a chunked font whose glyphs are 'size' bytes long, that is
+ * 1 + widthbytes * height or 1 + heightbytes * width.
+ */
+static inline const uint8_t *lcd_font_chunk_glyph(const uint8_t *const *chunks,
+		int chunk, int size, int n)
+{
+	return chunks[n / chunk] + (n % chunk) * size;
+}
+
 #endif // __LCD_FONT_H
@@ -0,0 +1,158 @@
+/*
+ * Binary font container generated by fontgen.py with the binary format.
+ *
+ * The container holds the same glyph data as the lcd_font and lcd_font_v
+ * arrays but can be flashed separately from the firmware, for instance into
+ * external SPI flash. When the container is memory-mapped the glyphs can be
+ * used in place. Otherwise read the header once, then compute the offset of
+ * each glyph and read glyph_size bytes from there.
+ *
+ * All fields are little-endian and every section is 4 byte aligned.
+ *
+ *	+--------------------------+ 0
+ *	| lcd_font_bin header      |
+ *	+--------------------------+ ranges_offset (optional)
+ *	| uint32_t nranges         |
+ *	| lcd_font_range[nranges]  |
+ *	+--------------------------+ offsets_offset (optional)
+ *	| uint32_t offsets[count+1]|
+ *	+--------------------------+ data_offset
+ *	| glyph data               |
+ *	+--------------------------+
+ */
+
+#ifndef __LCD_FONT_BIN_H
+#define __LCD_FONT_BIN_H
+
+#include <stdint.h>
+#include <string.h>
+#include "lcd_font.h"
+
+#define LCD_FONT_BIN_MAGIC		"LCDF"
+#define LCD_FONT_BIN_VERSION		1
+
+/* layout */
+#define LCD_FONT_BIN_HORIZONTAL		0
+#define LCD_FONT_BIN_VERTICAL		1
+#define LCD_FONT_BIN_HORIZONTAL_COMPACT	2
+#define LCD_FONT_BIN_VERTICAL_COMPACT	3
+#define LCD_FONT_BIN_HORIZONTAL_RLE	4
+#define LCD_FONT_BIN_VERTICAL_RLE	5
+#define LCD_FONT_BIN_HORIZONTAL_LSB	6
+#define LCD_FONT_BIN_PAGE		7
+#define LCD_FONT_BIN_PAGE_MSB		8
+#define LCD_FONT_BIN_RGB565		9
+
+/* flags */
+#define LCD_FONT_BIN_FLAG_OFFSETS	0x01
+#define LCD_FONT_BIN_FLAG_RANGES	0x02
+
+/*
+ * container header
+ *
+ *	magic: "LCDF"
+ *	version: LCD_FONT_BIN_VERSION
+ *	layout: one of the LCD_FONT_BIN_ layouts above
+ *	flags: LCD_FONT_BIN_FLAG_OFFSETS and LCD_FONT_BIN_FLAG_RANGES when the
+ *		offset table and the code range table are present
+ *	count: number of glyphs
+ *	glyph_size: number of bytes of each glyph, the width byte included,
+ *		0 for the compact and rle layouts
+ *	glyph_stride: distance between glyphs in the data section, 0 for the
+ *		compact and rle layouts
+ *	bytesper: widthbytes (horizontal) or heightbytes (vertical), 0 for the
+ *		compact and rle layouts
+ *	lines: height (horizontal) or width (vertical), font height for the
+ *		compact and rle layouts
+ *	first_code: character code of the first glyph
+ *	last_code: character code of the last glyph
+ *	offsets_offset: offset of the glyph offset table, 0 if absent
+ *	data_offset: offset of the glyph data
+ *	ranges_offset: offset of the code range table, 0 if absent
+ *
+ * Glyph data has the same format as in lcd_font and lcd_font_v, see
+ * inc/lcd_font.h for the other controller layouts. In the compact layouts,
+ * which always have the offset table, every glyph starts with the width,
+ * height, xoffset, yoffset and advance bytes of its lcd_glyph_compact entry
+ * followed by the bitmap as in lcd_font_compact and lcd_font_v_compact. The
+ * rle layouts are the same with the bitmap encoded as in lcd_font_rle.h.
+ */
+
+typedef struct _lcd_font_bin
+{
+	char magic[4];
+	uint16_t version;
+	uint8_t layout;
+	uint8_t flags;
+	uint32_t count;
+	uint32_t glyph_size;
+	uint32_t glyph_stride;
+	uint16_t bytesper;
+	uint16_t lines;
+	uint32_t first_code;
+	uint32_t last_code;
+	uint32_t offsets_offset;
+	uint32_t data_offset;
+	uint32_t ranges_offset;
+} lcd_font_bin;
+
+/*
+ * Check the header of a container. Returns 0 when valid.
+ */
+static inline int lcd_font_bin_check(const lcd_font_bin *font)
+{
+	if (memcmp(font->magic, LCD_FONT_BIN_MAGIC, 4) != 0)
+		return -1;
+	if (font->version != LCD_FONT_BIN_VERSION)
+		return -1;
+	return 0;
+}
+
+/*
+ * Offset of the glyph of a character code from the start of the container,
+ * or 0 when the font does not have the code. The tables are only consulted
+ * when present, so 'ranges' and 'offsets' may be NULL for containers without
+ * them. 'ranges' points to the entries, after the nranges word.
+ */
+static inline uint32_t lcd_font_bin_glyph_offset(const lcd_font_bin *font,
+		const lcd_font_range *ranges, int nranges,
+		const uint32_t *offsets, uint32_t code)
+{
+	int index;
+
+	if (code < font->first_code || code > font->last_code)
+		return 0;
+	if (font->flags & LCD_FONT_BIN_FLAG_RANGES) {
+		index = lcd_font_find(ranges, nranges, code);
+		if (index < 0)
+			return 0;
+	} else {
+		index = code - font->first_code;
+	}
+
+	if (font->flags & LCD_FONT_BIN_FLAG_OFFSETS)
+		return font->data_offset + offsets[index];
+	return font->data_offset + index * font->glyph_stride;
+}
+
+/*
+ * Glyph of a character code in a memory-mapped container, or NULL when the
+ * code is out of range.
+ */
+static inline const uint8_t *lcd_font_bin_glyph(const lcd_font_bin *font,
+		uint32_t code)
+{
+	const uint8_t *base = (const uint8_t *)font;
+	const uint32_t *offsets =
+		(const uint32_t *)(base + font->offsets_offset);
+	const uint32_t *ranges =
+		(const uint32_t *)(base + font->ranges_offset);
+	int nranges = font->ranges_offset ? (int)ranges[0] : 0;
+	uint32_t offset = lcd_font_bin_glyph_offset(font,
+			(const lcd_font_range *)(ranges + 1), nranges,
+			offsets, code);
+
+	return offset ? base + offset : NULL;
+}
+
+#endif // __LCD_FONT_BIN_H
@@ -0,0 +1,112 @@
+/*
+ * Run-length encoded fonts generated by fontgen.py with the rle option.
+ *
+ * The glyphs are cropped as in lcd_font_compact and lcd_font_v_compact, and
+ * the bitmap of each glyph is replaced by a run-length encoded pixel stream.
+ * The pixels are taken line by line, rows for lcd_font_rle and columns for
+ * lcd_font_v_rle, as one continuous stream. Every byte holds a run of blank
+ * pixels in the high nibble followed by a run of set pixels in the low nibble.
+ * Runs longer than 15 pixels go on in the next byte. The stream covers every
+ * pixel of the glyph and has no terminator.
+ *
+ * The decoder produces one line at a time in the same format as the compact
+ * bitmaps, so only a line buffer is needed:
+ *
+ *	lcd_rle_state s;
+ *	uint8_t line[LINE_BYTES];
+ *
+ *	lcd_rle_init(&s, font->data + glyph->offset);
+ *	for (y = 0; y < glyph->height; y++) {
+ *		lcd_rle_line(&s, line, glyph->width, 1);
+ *		...
+ *	}
+ *
+ * lcd_font_v_rle glyphs decode into glyph->width columns of glyph->height
+ * pixels with msb_first set to 0, ready for SED1520 type controllers.
+ */
+
+#ifndef __LCD_FONT_RLE_H
+#define __LCD_FONT_RLE_H
+
+#include <stdint.h>
+#include <string.h>
+#include "lcd_font.h"
+
+/*
+ * fonts, same as lcd_font_compact and lcd_font_v_compact except for the
+ * encoding of the data
+ *
+ *	height: number of horizontal lines of the font bounding box
+ *	nranges: number of entries in ranges
+ *	ranges: code range table, see lcd_font_find()
+ *	glyphs: metrics of every glyph, offset is the position of its stream
+ *	data: encoded pixel streams
+ */
+
+typedef struct _horizontal_raster_font_rle
+{
+	int height;
+	int nranges;
+	const lcd_font_range *ranges;
+	const lcd_glyph_compact *glyphs;
+	const uint8_t *data;
+} lcd_font_rle;
+
+typedef struct _vertical_raster_font_rle
+{
+	int height;
+	int nranges;
+	const lcd_font_range *ranges;
+	const lcd_glyph_compact *glyphs;
+	const uint8_t *data;
+} lcd_font_v_rle;
+
+/*
+ * decoder state, runs may continue from one line into the next
+ */
+
+typedef struct _rle_state
+{
+	const uint8_t *src;
+	uint8_t zeros;
+	uint8_t ones;
+} lcd_rle_state;
+
+static inline void lcd_rle_init(lcd_rle_state *s, const uint8_t *src)
+{
+	s->src = src;
+	s->zeros = 0;
+	s->ones = 0;
+}
+
+/*
+ * Decode the next line of 'length' pixels into (length + 7) / 8 bytes of
+ * 'line'. Pixels go from the MSB when msb_first is set, from the LSB otherwise.
+ * The state must not be used beyond the last line of the glyph.
+ */
+static inline void lcd_rle_line(lcd_rle_state *s, uint8_t *line, int length,
+		int msb_first)
+{
+	int x = 0;
+
+	memset(line, 0, (length + 7) / 8);
+	while (x < length) {
+		if (s->zeros == 0 && s->ones == 0) {
+			s->zeros = *s->src >> 4;
+			s->ones = *s->src & 0x0f;
+			s->src++;
+		}
+		if (s->zeros) {
+			int n = length - x < s->zeros ? length - x : s->zeros;
+
+			s->zeros -= n;
+			x += n;
+		} else {
+			for (; s->ones && x < length; s->ones--, x++)
+				line[x >> 3] |= msb_first ?
+					0x80 >> (x & 7) : 1 << (x & 7);
+		}
+	}
+}
+
+#endif // __LCD_FONT_RLE_H
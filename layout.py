@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+#
+from settings import *
+from bitmap import pack_horizontal, pack_pages, pack_rgb565, pack_vertical, \
+        unpack_horizontal, unpack_pages, unpack_rgb565, unpack_vertical
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Raised for unknown layouts or layout options.
+#
+class LayoutError(ValueError):
+    pass
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Layouts turn the glyph bit matrix into the byte order a display controller
+# takes, so that firmware can stream glyphs to it, e.g. by DMA, without
+# shuffling bits at draw time.
+#
+# A layout derives from Layout, sets a unique name and implements geometry(),
+# pack() and unpack(). Registered layouts are selected by name with
+# get_layout(). All of them pack the same bit matrix from
+# bitmap.glyph_matrix().
+#
+#   struct_name: C struct of the generated font, see inc/lcd_font.h
+#   tag: appended to the output name to tell the layouts apart
+#   compact: the layout has a compact form, see bitmap.pack_compact()
+#   vertical: the compact form holds columns instead of lines
+#
+LAYOUTS = {}
+
+def register_layout(cls):
+    LAYOUTS[cls.name] = cls
+    return cls
+
+def get_layout(name = DEFAULT_OUTPUT_TYPE, **options):
+    try:
+        cls = LAYOUTS[name]
+    except KeyError:
+        raise LayoutError('unknown layout: {}'.format(name))
+    return cls(**options)
+
+class Layout(object):
+    name = None
+    struct_name = 'lcd_font'
+    tag = ''
+    compact = False
+    vertical = False
+
+    # options of other layouts are ignored
+    def __init__(self, **options):
+        pass
+
+    #
+    # Returns (bytesper, lines) of the font, the first two fields of the C
+    # struct.
+    #
+    def geometry(self, fbbx, fbby):
+        raise NotImplementedError
+
+    #
+    #   matrix: glyph bit matrix from glyph_matrix()
+    #   widths: glyph widths from glyph_widths()
+    #   fbbx: font bounding box width
+    #
+    # Returns uint8 array of shape (glyphs, 1 + bytesper * lines), the glyph
+    # width followed by the glyph data.
+    #
+    def pack(self, matrix, widths, fbbx):
+        raise NotImplementedError
+
+    #
+    # Inverse of pack(), for tools that draw with the packed glyphs.
+    #
+    #   data: uint8 array of shape (glyphs, 1 + bytesper * lines) from pack()
+    #   bytesper, lines: geometry of the data, see geometry()
+    #
+    # Returns (widths, matrix), see bitmap.unpack_horizontal().
+    #
+    def unpack(self, data, bytesper, lines):
+        raise NotImplementedError
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Horizontal lines for TFT LCD controllers, leftmost pixel in the MSB.
+#
+@register_layout
+class HorizontalLayout(Layout):
+    name = 'horizontal'
+    compact = True
+    msb_first = True
+
+    def geometry(self, fbbx, fbby):
+        return (fbbx + 7) // 8, fbby
+
+    def pack(self, matrix, widths, fbbx):
+        return pack_horizontal(matrix, widths, self.msb_first)
+
+    def unpack(self, data, bytesper, lines):
+        return unpack_horizontal(data, lines, self.msb_first)
+
+#
+# Horizontal lines with the leftmost pixel in the LSB.
+#
+@register_layout
+class HorizontalLsbLayout(HorizontalLayout):
+    name = 'horizontal-lsb'
+    tag = 'L'
+    compact = False
+    msb_first = False
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Columns for Epson SED1520 compatible controllers, each column heightbytes
+# long with the topmost pixel in the LSB.
+#
+@register_layout
+class VerticalLayout(Layout):
+    name = 'vertical'
+    struct_name = 'lcd_font_v'
+    tag = 'V'
+    compact = True
+    vertical = True
+
+    def geometry(self, fbbx, fbby):
+        return (fbby + 7) // 8, fbbx
+
+    def pack(self, matrix, widths, fbbx):
+        return pack_vertical(matrix, widths, fbbx)
+
+    def unpack(self, data, bytesper, lines):
+        return unpack_vertical(data, bytesper)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Pages of SSD1306, SH1106 and ST7565 type controllers, one byte per column
+# for each page of 8 rows with the topmost pixel in the LSB.
+#
+@register_layout
+class PageLayout(Layout):
+    name = 'page'
+    struct_name = 'lcd_font_v'
+    tag = 'P'
+    msb_first = False
+
+    def geometry(self, fbbx, fbby):
+        return (fbby + 7) // 8, fbbx
+
+    def pack(self, matrix, widths, fbbx):
+        return pack_pages(matrix, widths, fbbx, self.msb_first)
+
+    def unpack(self, data, bytesper, lines):
+        return unpack_pages(data, bytesper, lines, self.msb_first)
+
+#
+# Pages with the topmost pixel in the MSB.
+#
+@register_layout
+class PageMsbLayout(PageLayout):
+    name = 'page-msb'
+    tag = 'PM'
+    msb_first = True
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# RGB565 pixels in two fixed colors for color TFT controllers, two bytes per
+# pixel, row by row.
+#
+#   fg, bg: RGB565 colors of set and blank pixels
+#   big_endian: byte order of the pixels
+#
+@register_layout
+class Rgb565Layout(Layout):
+    name = 'rgb565'
+    tag = 'RGB'
+
+    def __init__(self, fg = DEFAULT_FG_COLOR, bg = DEFAULT_BG_COLOR,
+            big_endian = True, **options):
+        if not (0 <= fg <= 0xffff and 0 <= bg <= 0xffff):
+            raise LayoutError('RGB565 colors are 16 bit')
+        self.fg, self.bg, self.big_endian = fg, bg, big_endian
+
+    def geometry(self, fbbx, fbby):
+        return fbbx * 2, fbby
+
+    def pack(self, matrix, widths, fbbx):
+        return pack_rgb565(matrix, widths, fbbx, self.fg, self.bg,
+                self.big_endian)
+
+    def unpack(self, data, bytesper, lines):
+        return unpack_rgb565(data, bytesper // 2, self.fg, self.big_endian)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
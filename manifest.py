@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+#
+import json
+import os
+import tempfile
+import time
+from settings import *
+from cache import file_digest, make_key
+from fontlib import GENERATOR_VERSION
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Dependency manifest of the generated files, for incremental builds.
+#
+# The manifest lives in the output directory and records for every target,
+# that is every job of the batch matrix with the output options, the digest
+# of the font file, the parameters, the generator version and the files
+# written. A target is rebuilt when it is new, when one of these changed or
+# when one of its files is gone. Font files whose mtime and size are unchanged
+# are not read again, so checking an unchanged tree only stats the fonts.
+#
+# Targets of other parameters are kept, so switching back and forth between
+# options does not rebuild. The files of fonts that no longer exist are
+# removed, see prune().
+#
+
+# bump when the manifest format changes, older manifests are rebuilt
+MANIFEST_VERSION = 1
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Manifest of an output directory.
+#
+#   outdir: output directory, the manifest is DEFAULT_MANIFEST_NAME in it
+#   options: output options shared by all jobs, (backend, oformat, compact,
+#       rle, colors, split), see generate_font_file()
+#
+class Manifest(object):
+
+    def __init__(self, outdir = DEFAULT_OUTPUT_DIR, options = ()):
+        self.outdir = outdir
+        self.path = os.path.join(outdir, DEFAULT_MANIFEST_NAME)
+        self.options = tuple(tuple(x) if isinstance(x, list) else x
+                for x in options)
+        self.targets = {}
+        self.digests = {}
+        try:
+            with open(self.path) as f:
+                doc = json.load(f)
+            if doc.get('version') == MANIFEST_VERSION:
+                self.targets = doc['targets']
+        except (IOError, ValueError, KeyError):
+            pass
+
+    # target of a batch.Job
+    def _target(self, job):
+        fname = os.path.abspath(job.fname)
+        return fname, make_key(fname, job.ftype, job.psize, job.chars,
+                job.suffix, self.options)
+
+    #
+    # (mtime, size, digest) of a font file, the recorded digest when the
+    # mtime and the size match the entry.
+    #
+    def _digest(self, fname, entry = None):
+        if fname not in self.digests:
+            st = os.stat(fname)
+            if entry is not None and entry['mtime'] == st.st_mtime \
+                    and entry['size'] == st.st_size:
+                digest = entry['digest']
+            else:
+                digest = file_digest(fname)
+            self.digests[fname] = (st.st_mtime, st.st_size, digest)
+        return self.digests[fname]
+
+    #
+    # Jobs whose files are missing or out of date.
+    #
+    #   jobs: list of batch.Job
+    #
+    # Fonts that cannot be read are left to the conversion to report.
+    #
+    def stale(self, jobs):
+        self.digests = {}
+        stale = []
+        for job in jobs:
+            fname, key = self._target(job)
+            entry = self.targets.get(key)
+            if entry is None or entry['version'] != GENERATOR_VERSION \
+                    or not all(os.path.exists(os.path.join(self.outdir, p))
+                    for p in entry['outputs']):
+                stale.append(job)
+                continue
+            try:
+                mtime, size, digest = self._digest(fname, entry)
+            except OSError:
+                stale.append(job)
+                continue
+            if digest != entry['digest']:
+                stale.append(job)
+            else:
+                # touched but unchanged, skip the digest next time
+                entry['mtime'], entry['size'] = mtime, size
+        return stale
+
+    #
+    # Record the files written by a job.
+    #
+    #   job: batch.Job
+    #   paths: files written, see metrics.info['files'] of the job
+    #
+    # Other targets that wrote any of these files are forgotten, as their
+    # files are overwritten, so that they are rebuilt when requested again.
+    #
+    def record(self, job, paths):
+        fname, key = self._target(job)
+        try:
+            mtime, size, digest = self._digest(fname)
+        except OSError:
+            return
+        outputs = sorted(os.path.relpath(p, self.outdir) for p in paths)
+        for other in [k for k, entry in self.targets.items()
+                if set(entry['outputs']).intersection(outputs)]:
+            del self.targets[other]
+        self.targets[key] = {
+            'font': fname,
+            'mtime': mtime,
+            'size': size,
+            'digest': digest,
+            'params': {
+                'type': job.ftype,
+                'size': job.psize,
+                'chars': job.chars,
+                'suffix': job.suffix,
+                'options': self.options,
+            },
+            'version': GENERATOR_VERSION,
+            'outputs': outputs,
+        }
+
+    #
+    # Remove the files of the fonts that no longer exist and forget them.
+    #
+    # Returns the paths removed.
+    #
+    def prune(self):
+        gone = [key for key, entry in self.targets.items()
+                if not os.path.exists(entry['font'])]
+        removed = []
+        for key in gone:
+            for p in self.targets.pop(key)['outputs']:
+                path = os.path.join(self.outdir, p)
+                try:
+                    os.remove(path)
+                    removed.append(path)
+                except OSError:
+                    pass
+        return removed
+
+    # write the manifest atomically
+    def save(self):
+        if not os.path.exists(self.outdir):
+            os.makedirs(self.outdir, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=self.outdir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': MANIFEST_VERSION,
+                        'targets': self.targets}, f, indent=1, sort_keys=True)
+            os.replace(tmpname, self.path)
+        except BaseException:
+            os.remove(tmpname)
+            raise
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# (mtime, size) of files, None for the missing ones.
+#
+def snapshot(fnames):
+    state = {}
+    for fname in fnames:
+        try:
+            st = os.stat(fname)
+            state[fname] = (st.st_mtime, st.st_size)
+        except OSError:
+            state[fname] = None
+    return state
+
+#
+# Call rebuild() whenever the watched files change, until interrupted.
+#
+#   files: files(), the list of files to watch, called on every poll so that
+#       new files are picked up
+#   rebuild: called once the files have not changed for delay seconds
+#   interval: seconds between two polls
+#   delay: quiet time in seconds before a rebuild, so that a font copied in
+#       several writes or several fonts saved at once rebuild once
+#
+# Files are polled rather than watched with OS notifications, which works on
+# every platform and network drives without another dependency.
+#
+def watch(files, rebuild,
+        interval = DEFAULT_WATCH_INTERVAL,
+        delay = DEFAULT_WATCH_DELAY):
+    state = snapshot(files())
+    changed = None
+    while True:
+        time.sleep(interval)
+        current = snapshot(files())
+        if current != state:
+            state, changed = current, time.time()
+        elif changed is not None and time.time() - changed >= delay:
+            changed = None
+            rebuild()
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#
+import cProfile
+import io
+import json
+import platform
+import pstats
+import time
+import tracemalloc
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Stage timings and counters of a conversion.
+#
+# generate_font_file() marks the end of every stage with lap(), which adds the
+# wall time since the previous mark to the stage, so stages run chunk by chunk
+# add up. The stages are
+#
+#   charset: character codes from the arguments and the string files
+#   cache: cache lookups and stores
+#   rasterize: the rasterizer backend and the parsing of its bdf stream
+#   matrix: glyph bit matrices, see bitmap.glyph_matrix()
+#   pack: packing into the layout, the rotation of the vertical layouts
+#   encode: run-length encoding and its verification
+#   format: C text or binary container
+#   write: output files
+#
+# and the counters
+#
+#   codes: requested character codes
+#   glyphs: glyphs the font has of them
+#   glyph_bytes: glyph data bytes, bitmaps and widths or metrics
+#   output_bytes: bytes of the output files
+#   cache_hits: outputs taken from the cache
+#
+#   trace_memory: record the peak memory of every stage with tracemalloc
+#   profile: run cProfile over the conversion
+#
+# Profiling and memory tracing slow the conversion down, the timings of such a
+# run are not comparable with a plain one.
+#
+PROFILE_TOP = 25
+
+class Metrics(object):
+
+    def __init__(self, trace_memory = False, profile = False):
+        self.info = {}
+        self.stages = {}
+        self.counters = {}
+        self.memory = {}
+        self.trace_memory = trace_memory
+        self.profiler = cProfile.Profile() if profile else None
+        self.stats = None
+        self.elapsed = 0.0
+        self.mark = self.begin = time.perf_counter()
+
+    # start the clock, the memory tracing and the profiler
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.mark = self.begin = time.perf_counter()
+
+    # stop them again
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.begin
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.stats = pstats.Stats(self.profiler, stream=io.StringIO())
+            self.profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    # end of a stage
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.mark
+        self.mark = now
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            self.memory[stage] = max(self.memory.get(stage, 0), peak)
+            tracemalloc.reset_peak()
+
+    def count(self, name, n = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    #
+    # Functions of the profile with the highest cumulative time, as
+    # {'function', 'calls', 'total', 'cumulative'}.
+    #
+    def profile_top(self, top = PROFILE_TOP):
+        if self.stats is None:
+            return []
+        # sort_stats() leaves the order in fcn_list
+        self.stats.sort_stats('cumulative')
+        rows = []
+        for func in self.stats.fcn_list[:top]:
+            cc, nc, tt, ct, callers = self.stats.stats[func]
+            rows.append({
+                'function': pstats.func_std_string(func),
+                'calls': nc,
+                'total': tt,
+                'cumulative': ct,
+            })
+        return rows
+
+    # plain data for JSON and for passing between processes
+    def as_dict(self):
+        out = {
+            'info': self.info,
+            'elapsed': self.elapsed,
+            'stages': self.stages,
+            'counters': self.counters,
+        }
+        if self.trace_memory:
+            out['peak_bytes'] = self.memory
+        if self.stats is not None:
+            out['profile'] = self.profile_top()
+        return out
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Write the metrics of a batch run as JSON.
+#
+#   fname: output file
+#   results: batch.Result list, see batch.run_batch()
+#   elapsed: wall time of the run in seconds
+#   version: generator version
+#
+# The file holds the environment, every job with its parameters, outcome and
+# metrics, and the totals of the stages and counters over all jobs, e.g. for
+# tracking the cost of the conversions across builds.
+#
+def write_metrics(fname, results, elapsed, version = ''):
+    totals = {'stages': {}, 'counters': {}}
+    jobs = []
+    for r in results:
+        m = r.metrics or {}
+        for group in ('stages', 'counters'):
+            for name, value in m.get(group, {}).items():
+                totals[group][name] = totals[group].get(name, 0) + value
+        jobs.append({
+            'font': r.job.fname,
+            'type': r.job.ftype,
+            'size': r.job.psize,
+            'chars': r.job.chars,
+            'output': r.output,
+            'error': r.error,
+            'elapsed': r.elapsed,
+            'metrics': m,
+        })
+
+    doc = {
+        'generator': version,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'elapsed': elapsed,
+        'jobs': jobs,
+        'failed': sum(1 for r in results if r.error),
+        'totals': totals,
+    }
+    with open(fname, 'w') as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+#
+from collections import OrderedDict
+import threading
+import numpy as np
+from settings import *
+from charset import find_code
+from fontlib import load_font, pack_font
+from layout import LayoutError
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Preview of the glyphs as the LCD shows them.
+#
+# Text is drawn from the packed glyph data itself, decoded back into pixels,
+# so the preview shows the 1-bit glyphs that ship rather than a desktop
+# rendering of the font.
+#
+
+# colors of set and blank pixels of the zoomed preview
+LCD_ON = (0x20, 0x28, 0x20)
+LCD_OFF = (0x9e, 0xb0, 0x8a)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Pixels of a packed glyph.
+#
+#   packed: PackedFont of a fixed size layout, see fontlib.pack_font()
+#   index: glyph index
+#
+# Returns bool array of shape (fbby, width) decoded from the glyph data.
+#
+def glyph_pixels(packed, index):
+    if packed.compact:
+        raise LayoutError('no preview of compact fonts')
+    widths, matrix = packed.layout.unpack(packed.data[index:index+1],
+            packed.bytesper, packed.lines)
+    # rows of vertical layouts are whole pages, aligned to the bottom
+    bits = matrix[0, matrix.shape[1] - packed.glyphs.font.fbby:]
+    width = int(widths[0])
+
+    pixels = np.zeros((bits.shape[0], width), dtype=bool)
+    width = min(width, bits.shape[1])
+    pixels[:, :width] = bits[:, :width]
+    return pixels
+
+#
+# Glyph index of a character code in a packed font or -1.
+#
+def glyph_index(packed, code):
+    if packed.ranges is not None:
+        return find_code(packed.ranges, code)
+    index = code - packed.codes[0]
+    return index if 0 <= index < len(packed.codes) else -1
+
+#
+# Draw text with the glyphs of a packed font.
+#
+#   packed: PackedFont, see glyph_pixels()
+#   text: text to draw, characters the font lacks are left out
+#   max_width: wrap lines at spaces to fit this many pixels, 0 for no wrap
+#   spacing: blank rows between lines
+#
+# Returns bool array of shape (rows, columns).
+#
+def render_text(packed, text, max_width = 0, spacing = 1):
+    glyphs = {}
+    def pixels(ch):
+        if ch not in glyphs:
+            index = glyph_index(packed, ord(ch))
+            glyphs[ch] = glyph_pixels(packed, index) if index >= 0 else None
+        return glyphs[ch]
+
+    # greedy word wrap
+    lines = []
+    for paragraph in text.split('\n'):
+        line, width = [], 0
+        for word in paragraph.split(' '):
+            word = [p for p in map(pixels, word + ' ') if p is not None]
+            advance = sum(p.shape[1] for p in word)
+            if line and max_width and width + advance > max_width:
+                lines.append(line)
+                line, width = [], 0
+            line.extend(word)
+            width += advance
+        lines.append(line)
+
+    height = packed.glyphs.font.fbby
+    columns = max([sum(p.shape[1] for p in line) for line in lines] + [1])
+    if max_width:
+        columns = min(columns, max_width)
+    image = np.zeros((len(lines) * (height + spacing), columns), dtype=bool)
+    for idx, line in enumerate(lines):
+        y, x = idx * (height + spacing), 0
+        for p in line:
+            w = min(p.shape[1], columns - x)
+            if w <= 0:
+                break
+            image[y:y+height, x:x+w] = p[:, :w]
+            x += w
+    return image
+
+#
+# Scale a preview up into RGB pixels.
+#
+#   image: bool array from render_text()
+#   zoom: screen pixels per LCD pixel
+#   grid: leave a gap between the LCD pixels when the zoom allows
+#
+# Returns uint8 array of shape (rows * zoom, columns * zoom, 3).
+#
+def zoom_pixels(image, zoom, grid = True):
+    colors = np.array([LCD_OFF, LCD_ON], dtype=np.uint8)
+    rgb = colors[image.astype(np.uint8)]
+    rgb = np.repeat(np.repeat(rgb, zoom, axis=0), zoom, axis=1)
+    if grid and zoom >= 3:
+        # a slightly darker gap on the last row and column of every pixel
+        gap = (np.array(LCD_OFF) * 0.9).astype(np.uint8)
+        rgb[zoom-1::zoom, :][~image.repeat(zoom, axis=1)] = gap
+        rgb[:, zoom-1::zoom][~image.repeat(zoom, axis=0)] = gap
+    return rgb
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Bounded least recently used cache, safe to share between threads.
+#
+#   max_size: maximum number of entries
+#
+class LruCache(object):
+
+    def __init__(self, max_size = DEFAULT_PREVIEW_CACHE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+#
+# Packed font for the preview, through an LruCache keyed on (font file, size,
+# layout, character set, rasterizer).
+#
+#   fname, psize, ftype, chars, backend: see generate_font_file()
+#   cache: LruCache or None
+#
+def preview_font(fname, psize, ftype,
+        chars = None,
+        backend = DEFAULT_RASTERIZER,
+        cache = None):
+    key = (fname, psize, ftype, chars, backend)
+    packed = cache.get(key) if cache is not None else None
+    if packed is None:
+        packed = pack_font(load_font(fname, psize, chars, backend = backend),
+                ftype)
+        if cache is not None:
+            cache.put(key, packed)
+    return packed
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+#
+import signal
+import subprocess
+from settings import *
+from bdf import SUPPORTED_VERSIONS, BdfFont, parse_bdf, read_bdf
+from charset import code_ranges
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Raised when a font cannot be rasterized.
+#
+class RasterizerError(RuntimeError):
+    pass
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Rasterizer backends turn a font file into a BdfFont.
+#
+# A backend derives from Rasterizer, sets a unique name and implements
+# rasterize(). Registered backends are selected by name with get_rasterizer().
+#
+RASTERIZERS = {}
+
+def register_rasterizer(cls):
+    RASTERIZERS[cls.name] = cls
+    return cls
+
+def get_rasterizer(name = DEFAULT_RASTERIZER):
+    try:
+        return RASTERIZERS[name]()
+    except KeyError:
+        raise RasterizerError('unknown rasterizer: {}'.format(name))
+
+class Rasterizer(object):
+    name = None
+
+    #
+    #   fname: source font file
+    #   psize: font size in pixel unit
+    #   codes: sorted sequence of character codes, see charset.py
+    #
+    # Returns a BdfFont holding the glyphs of the codes the font has, in code
+    # order. Raises RasterizerError or BdfError on failure.
+    #
+    def rasterize(self, fname, psize, codes):
+        raise NotImplementedError
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Rasterize with the external otf2bdf program.
+#
+# otf2bdf writes the BDF to a pipe that is parsed while it is being produced.
+# Arguments are passed without a shell, so font paths may contain spaces.
+#
+@register_rasterizer
+class Otf2BdfRasterizer(Rasterizer):
+    name = 'otf2bdf'
+
+    def rasterize(self, fname, psize, codes):
+        # otf2bdf takes a space separated list of ranges
+        subrange = ' '.join('{}_{}'.format(start, start + count - 1)
+                for start, count, index in code_ranges(codes))
+        cmd = ['otf2bdf',
+                '-p', str(psize),
+                '-l', subrange,
+                fname]
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        except OSError as e:
+            raise RasterizerError('cannot run otf2bdf: {}'.format(e))
+
+        try:
+            font = parse_bdf(proc.stdout)
+        except ValueError:
+            # a failing otf2bdf leaves a broken stream, report its status
+            proc.stdout.close()
+            status = proc.wait()
+            if status not in (0, -signal.SIGPIPE):
+                raise RasterizerError(
+                        'otf2bdf exited with status {}'.format(status))
+            raise
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+        # otf2bdf emits glyphs in code order, but make sure
+        if list(font.encoding) != sorted(font.encoding):
+            font = font.subset(codes)
+
+        return font
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Read an existing BDF file, keeping the glyphs of the requested codes.
+# The point size argument is ignored since the bitmaps are already rendered.
+#
+@register_rasterizer
+class BdfFileRasterizer(Rasterizer):
+    name = 'bdf'
+
+    def rasterize(self, fname, psize, codes):
+        try:
+            font = read_bdf(fname)
+        except IOError as e:
+            raise RasterizerError('cannot read {}: {}'.format(fname, e))
+        return font.subset(codes)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Rasterize in-process with FreeType through matplotlib's FT2Font.
+#
+# No external program is spawned. Glyphs are rendered in monochrome at 72 dpi,
+# where one point equals one pixel, and stored as the same glyph records the
+# BDF path produces. The font bounding box is the union of the glyph boxes.
+#
+@register_rasterizer
+class FreeTypeRasterizer(Rasterizer):
+    name = 'freetype'
+    dpi = 72
+
+    def rasterize(self, fname, psize, codes):
+        try:
+            import numpy as np
+            from matplotlib import ft2font
+        except ImportError as e:
+            raise RasterizerError('matplotlib is required: {}'.format(e))
+
+        # matplotlib 3.10 moved the load flags into an enum
+        try:
+            mono = ft2font.LoadFlags.TARGET_MONO
+        except AttributeError:
+            mono = ft2font.LOAD_TARGET_MONO
+
+        try:
+            face = ft2font.FT2Font(fname)
+        except (OSError, RuntimeError) as e:
+            raise RasterizerError('cannot load {}: {}'.format(fname, e))
+        face.set_size(psize, self.dpi)
+
+        font = BdfFont()
+        font.version = SUPPORTED_VERSIONS[0]
+        font.size = (psize, self.dpi, self.dpi)
+
+        # FT_STYLE_FLAG_ITALIC, FT_STYLE_FLAG_BOLD and FT_FACE_FLAG_FIXED_WIDTH,
+        # plain int in older matplotlib and enum.Flag in newer
+        style = getattr(face.style_flags, 'value', face.style_flags)
+        flags = getattr(face.face_flags, 'value', face.face_flags)
+        font.properties = {
+            'FAMILY_NAME': face.family_name,
+            'WEIGHT_NAME': 'Bold' if style & 2 else 'Medium',
+            'SLANT': 'I' if style & 1 else 'R',
+            'SETWIDTH_NAME': 'Normal',
+            'ADD_STYLE_NAME': '',
+            'PIXEL_SIZE': psize * self.dpi // 72,
+            'SPACING': 'M' if flags & 4 else 'P',
+        }
+
+        left = bottom = None
+        right = top = None
+        for code in codes:
+            # skip characters the font does not have, as otf2bdf does
+            if face.get_char_index(code) == 0:
+                continue
+
+            face.set_text(chr(code), 0.0, flags=mono)
+            glyph = face.load_char(code, flags=mono)
+            face.draw_glyphs_to_bitmap(antialiased=False)
+            image = np.asarray(face.get_image()) != 0
+            dwidth = int(round(glyph.horiAdvance / 64))
+
+            # crop the rendered image to the ink
+            rows = np.flatnonzero(image.any(axis=1))
+            cols = np.flatnonzero(image.any(axis=0))
+            if len(rows) == 0:
+                font.add_glyph(code, dwidth, (0, 0, 0, 0), b'')
+                continue
+            image = image[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
+            bbh, bbw = image.shape
+            bbxoff = int(round(glyph.horiBearingX / 64))
+            bbyoff = int(round(glyph.horiBearingY / 64)) - bbh
+
+            font.add_glyph(code, dwidth, (bbw, bbh, bbxoff, bbyoff),
+                    np.packbits(image, axis=1).tobytes())
+
+            if left is None:
+                left, bottom = bbxoff, bbyoff
+                right, top = bbxoff + bbw, bbyoff + bbh
+            else:
+                left, bottom = min(left, bbxoff), min(bottom, bbyoff)
+                right = max(right, bbxoff + bbw)
+                top = max(top, bbyoff + bbh)
+
+        if left is not None:
+            font.fbbx, font.fbby = right - left, top - bottom
+            font.xoff, font.yoff = left, bottom
+
+        return font
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+#
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+import numpy as np
+from settings import *
+from emit import format_data_lines, write_files
+from fontbin import FontBin, FontBinError
+from bdf import BdfError
+from fontlib import FontGenError, load_font, make_layout, pack_font
+from layout import LAYOUTS, LayoutError
+from rasterizer import RASTERIZERS, RasterizerError
+from subset import scan_file
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Text drawn on the host with the generated glyphs.
+#
+# Static screens and labels are composed here into bitmaps in the byte order
+# of the font layout, so that firmware copies them to the display as they are
+# instead of drawing glyph by glyph. Glyphs advance by their width byte as
+# firmware drawing with inc/lcd_font.h does.
+#
+# Every line of text is drawn by one gather over the decoded glyph matrix, and
+# all lines of a batch in a single one, so thousands of strings take well
+# under a second.
+#
+
+# C names of the screens of a screen file
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Glyphs of a generated font decoded for drawing.
+#
+#   layout: Layout of the font, screens are packed in its byte order
+#   widths: width byte of every glyph
+#   matrix: glyph bit matrix, see Layout.unpack()
+#   first_code: character code of the first glyph of a dense font
+#   ranges: code ranges of a sparse font, see charset.code_ranges()
+#
+class RenderFont(object):
+
+    def __init__(self, layout, widths, matrix, first_code, ranges = None):
+        self.layout = layout
+        self.height = matrix.shape[1]
+        self.widths = widths.astype(np.int64)
+
+        # one blank column past the glyph data, for advances beyond it
+        n, rows, cols = matrix.shape
+        self.matrix = np.zeros((n, rows, cols + 1), dtype=bool)
+        self.matrix[:, :, :cols] = matrix
+
+        # glyph index of every code up to the last one, -1 for the codes the
+        # font lacks; the extra last entry stands for all larger codes
+        if ranges is None:
+            ranges = [(first_code, n, 0)]
+        last = max(start + count for start, count, index in ranges)
+        self.lookup = np.full(last + 1, -1, dtype=np.int64)
+        for start, count, index in ranges:
+            self.lookup[start:start+count] = np.arange(index, index + count)
+
+    # glyph indices of the characters of a text the font has
+    def glyphs(self, text):
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+        index = self.lookup[np.minimum(codes, len(self.lookup) - 1)]
+        return index[index >= 0]
+
+    #
+    # Draw lines of text.
+    #
+    # Returns a bool array of shape (height, advance) for every line.
+    #
+    def render_lines(self, lines):
+        glyphs = [self.glyphs(line) for line in lines]
+        if not glyphs:
+            return []
+        g = np.concatenate(glyphs)
+        w = self.widths[g]
+        ends = np.cumsum(w)
+
+        # glyph and glyph column of every column of all lines side by side
+        total = int(ends[-1]) if len(ends) else 0
+        cols = np.arange(total) - np.repeat(ends - w, w)
+        cols = np.minimum(cols, self.matrix.shape[2] - 1)
+        strip = self.matrix[np.repeat(g, w), :, cols].T
+
+        edges = np.concatenate(([0], ends))[np.cumsum(
+                [len(x) for x in glyphs])]
+        return np.split(strip, edges[:-1], axis=1)
+
+#
+# RenderFont of a PackedFont, see fontlib.pack_font().
+#
+def render_font(packed):
+    if packed.compact:
+        raise LayoutError('cannot draw with compact fonts')
+    widths, matrix = packed.layout.unpack(packed.data, packed.bytesper,
+            packed.lines)
+    # rows of vertical layouts are whole pages, aligned to the bottom
+    matrix = matrix[:, matrix.shape[1] - packed.glyphs.font.fbby:]
+    return RenderFont(packed.layout, widths, matrix, packed.codes[0],
+            packed.ranges)
+
+#
+# RenderFont of a binary font container, see fontbin.py.
+#
+#   colors: (fg, bg) RGB565 colors of an rgb565 container
+#
+# The font bounding box is not stored in containers, so glyphs of vertical
+# layouts keep the blank rows above them up to the page boundary.
+#
+def read_render_font(fname, colors = None):
+    with FontBin(fname) as font:
+        name = font.layout_name
+        if name is None or name.endswith(('-compact', '-rle')):
+            raise LayoutError('cannot draw with the {} layout'.format(
+                    name or 'unknown'))
+        rows = []
+        for idx in range(len(font)):
+            view = font[idx]
+            rows.append(bytes(view))
+            view.release()
+        bytesper, lines = font.bytesper, font.lines
+        first_code, ranges = font.first_code, font.ranges
+
+    layout = make_layout(name, colors = colors)
+    data = np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(
+            len(rows), -1)
+    widths, matrix = layout.unpack(data, bytesper, lines)
+    return RenderFont(layout, widths, matrix, first_code, ranges)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# OR an image into a screen at (x, y), clipped to the screen.
+#
+def _blit(screen, image, x, y):
+    height, width = image.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1 = min(x + width, screen.shape[1])
+    y1 = min(y + height, screen.shape[0])
+    if x0 < x1 and y0 < y1:
+        screen[y0:y1, x0:x1] |= image[y0-y:y1-y, x0-x:x1-x]
+
+#
+# Compose a screen.
+#
+#   font: RenderFont
+#   width, height: size of the screen in pixels
+#   items: texts to draw, dicts of
+#       text: the text, lines separated by '\n' are font.height apart
+#       x, y: position of the top left corner, 0 by default
+#       align: 'left', 'center' or 'right' of the lines at x
+#
+# Returns bool array of shape (height, width).
+#
+def compose(font, width, height, items):
+    lines = []
+    for item in items:
+        lines.extend(str(item['text']).split('\n'))
+    images = iter(font.render_lines(lines))
+
+    screen = np.zeros((height, width), dtype=bool)
+    for item in items:
+        align = item.get('align', 'left')
+        if align not in ('left', 'center', 'right'):
+            raise FontGenError('unknown alignment: {}'.format(align))
+        y = int(item.get('y', 0))
+        for line in str(item['text']).split('\n'):
+            image = next(images)
+            x = int(item.get('x', 0))
+            if align == 'center':
+                x -= image.shape[1] // 2
+            elif align == 'right':
+                x -= image.shape[1]
+            _blit(screen, image, x, y)
+            y += font.height
+    return screen
+
+#
+# Draw every text as a bitmap of its own, as wide as its longest line.
+#
+#   font: RenderFont
+#   texts: list of strings
+#
+# Returns a bool array of shape (height, width) for every text.
+#
+def render_strings(font, texts):
+    split = [text.split('\n') for text in texts]
+    images = font.render_lines([line for lines in split for line in lines])
+
+    bitmaps = []
+    pos = 0
+    for lines in split:
+        parts = images[pos:pos+len(lines)]
+        pos += len(lines)
+        if len(parts) == 1:
+            bitmaps.append(parts[0])
+            continue
+        image = np.zeros((font.height * len(parts),
+                max(p.shape[1] for p in parts)), dtype=bool)
+        for idx, p in enumerate(parts):
+            image[idx*font.height:(idx+1)*font.height, :p.shape[1]] = p
+        bitmaps.append(image)
+    return bitmaps
+
+#
+# Screen or bitmap data in the byte order of a layout, the same as the glyph
+# data of the layout without the width byte.
+#
+# Returns uint8 array of shape (lines, bytesper), see Layout.geometry().
+# Vertical layouts align images whose height is not a multiple of 8 to the
+# bottom of the pages, as they do glyphs.
+#
+def pack_screen(layout, image):
+    height, width = image.shape
+    data = layout.pack(image[np.newaxis].astype(np.uint8),
+            np.zeros(1, dtype=np.uint8), width)
+    bytesper, lines = layout.geometry(width, height)
+    return data[0, 1:].reshape(lines, bytesper)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Screens of a screen file.
+#
+# A screen file is JSON, a list of screens or {"width", "height", "screens"}
+# with the default screen size:
+#
+#   {"width": 128, "height": 64, "screens": [
+#       {"name": "menu", "items": [
+#           {"text": "Settings", "x": 64, "y": 0, "align": "center"},
+#           {"text": "Contrast\nBacklight", "x": 4, "y": 16}]}]}
+#
+# Returns a list of (name, width, height, items), see compose().
+#
+def read_screens(fname):
+    try:
+        with open(fname, 'r', encoding='utf-8') as f:
+            doc = json.load(f)
+    except (IOError, ValueError) as e:
+        raise FontGenError('cannot read the screens: {}'.format(e))
+    if isinstance(doc, list):
+        doc = {'screens': doc}
+
+    screens = []
+    for screen in doc.get('screens', []):
+        name = screen.get('name', 'screen_{}'.format(len(screens)))
+        if not _IDENTIFIER.match(name):
+            raise FontGenError('screen names are C identifiers: ' + name)
+        width = int(screen.get('width', doc.get('width',
+                DEFAULT_SCREEN_WIDTH)))
+        height = int(screen.get('height', doc.get('height',
+                DEFAULT_SCREEN_HEIGHT)))
+        items = screen.get('items', [])
+        if any('text' not in item for item in items):
+            raise FontGenError('every item of {} needs a text'.format(name))
+        screens.append((name, width, height, items))
+    if not screens:
+        raise FontGenError('no screen in ' + fname)
+    return screens
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Emitters of rendered bitmaps, see emit.py. They return {file name: contents}.
+#
+#   name: output name, also the prefix of the C names
+#   bitmaps: (ident, label, image) of every bitmap, ident being a C
+#       identifier or None, label a comment and image a bool array
+#
+
+#
+# C header of lcd_bitmap structs, see inc/lcd_font.h.
+#
+#   layout: Layout giving the byte order
+#   source: font the bitmaps are drawn with, for the comment
+#
+# The bitmaps make up the table NAME, in order, with NAME_IDENT defined to
+# the position of the bitmaps that have an ident.
+#
+def emit_bitmaps_header(name, bitmaps, layout, source = ''):
+    lower, upper = name.lower(), name.upper()
+
+    out = []
+    out.append('/*\n')
+    out.append(' * Rendered Bitmaps\n')
+    out.append(' *\n')
+    out.append(' *\tfont source: {}\n'.format(os.path.basename(source)))
+    out.append(' *\tdata format: {}\n'.format(layout.name))
+    out.append(' */\n\n')
+    out.append('#ifndef __{}_H_\n'.format(upper))
+    out.append('#define __{}_H_\n\n'.format(upper))
+    out.append('#include "lcd_font.h"\n\n')
+
+    defines = ['#define {}_{} {}\n'.format(upper, ident.upper(), idx)
+            for idx, (ident, label, image) in enumerate(bitmaps)
+            if ident is not None]
+    if defines:
+        out.extend(defines)
+        out.append('#define {}_COUNT {}\n\n'.format(upper, len(bitmaps)))
+
+    table = []
+    for idx, (ident, label, image) in enumerate(bitmaps):
+        height, width = image.shape
+        data = pack_screen(layout, image)
+        array = '0'
+        if data.size:
+            array = '{}_{}'.format(lower, idx)
+            out.append('const uint8_t {}[] =\n'.format(array))
+            out.append('{\n')
+            out.append(format_data_lines(data,
+                    [str(n) for n in range(data.shape[0])]))
+            out.append('};\n\n')
+        table.append('\t{{ {}, {}, {} }}, // {}\n'.format(width, height,
+                array, label))
+
+    out.append('const lcd_bitmap {}[] =\n'.format(lower))
+    out.append('{\n')
+    out.extend(table)
+    out.append('};\n\n')
+    out.append('#endif // __{}_H_'.format(upper))
+    return {name + '.h': ''.join(out)}
+
+#
+# 1-bit grayscale PNG of an image, set pixels black.
+#
+def png_bytes(image):
+    if image.shape[1] == 0:
+        image = np.zeros((image.shape[0], 1), dtype=bool)
+    height, width = image.shape
+    rows = np.packbits(~image, axis=1)
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), rows))
+
+    def chunk(tag, body):
+        return struct.pack('>I', len(body)) + tag + body \
+                + struct.pack('>I', zlib.crc32(tag + body) & 0xffffffff)
+
+    return b'\x89PNG\r\n\x1a\n' \
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0, 0,
+                    0, 0)) \
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 9)) \
+            + chunk(b'IEND', b'')
+
+#
+# One PNG per bitmap, NAME_IDENT.png or NAME_N.png.
+#
+def emit_bitmaps_png(name, bitmaps):
+    files = {}
+    for idx, (ident, label, image) in enumerate(bitmaps):
+        files['{}_{}.png'.format(name, ident or idx)] = png_bytes(image)
+    return files
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+            description='Draw screens and strings with a generated font.')
+    parser.add_argument('font',
+            help='binary font container from fontgen.py -f binary, or a '
+            'font file to convert with -s, -t and -b')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--screens', metavar='FILE',
+            help='compose the screens of a JSON screen file, see '
+            'read_screens()')
+    source.add_argument('--strings', nargs='+', metavar='FILE',
+            help='draw every string of C sources, .po or .json files as a '
+            'bitmap')
+    source.add_argument('--text', nargs='+',
+            help='draw these strings as bitmaps')
+    parser.add_argument('-s', '--size', type=int, default=DEFAULT_POINT_SIZE,
+            help='font size in pixel unit')
+    parser.add_argument('-t', '--type', default=DEFAULT_OUTPUT_TYPE,
+            choices=sorted(LAYOUTS), help='glyph data layout')
+    parser.add_argument('-b', '--backend', default=DEFAULT_RASTERIZER,
+            choices=sorted(RASTERIZERS), help='rasterizer backend')
+    parser.add_argument('--colors', type=lambda x: int(x, 0), nargs=2,
+            metavar=('FG', 'BG'), help='RGB565 colors of the rgb565 layout')
+    parser.add_argument('-f', '--format', choices=('header', 'png'),
+            default='header', help='output file format')
+    parser.add_argument('-n', '--name', default='screens',
+            help='output name and C table name')
+    parser.add_argument('-o', '--outdir', default=DEFAULT_OUTPUT_DIR,
+            help='output directory')
+    args = parser.parse_args()
+
+    start = time.time()
+    try:
+        if args.screens:
+            screens = read_screens(args.screens)
+            texts = [str(item['text']) for screen in screens
+                    for item in screen[3]]
+        else:
+            texts = args.text or []
+            for fname in args.strings or []:
+                try:
+                    texts.extend(scan_file(fname))
+                except (IOError, ValueError) as e:
+                    raise FontGenError('cannot read {}: {}'.format(fname, e))
+            # each string once, in order of appearance, the empty header
+            # entries of catalogs left out
+            texts = [text for text in dict.fromkeys(texts) if text]
+
+        if args.font.lower().endswith('.bin'):
+            font = read_render_font(args.font, args.colors)
+        else:
+            # only the characters drawn are converted
+            codes = sorted(set(ord(ch) for text in texts for ch in text
+                    if ch != '\n'))
+            glyphs = load_font(args.font, args.size, codes or None,
+                    backend = args.backend)
+            font = render_font(pack_font(glyphs, args.type,
+                    colors = args.colors))
+
+        if args.screens:
+            bitmaps = [(name, name, compose(font, width, height, items))
+                    for name, width, height, items in screens]
+        else:
+            bitmaps = [(None, json.dumps(text, ensure_ascii=False), image)
+                    for text, image in zip(texts, render_strings(font, texts))]
+    except (IOError, FontGenError, LayoutError, FontBinError,
+            RasterizerError, BdfError) as e:
+        print('')
+        print('> Cannot render {}: {}'.format(args.font, e))
+        print('')
+        sys.exit(1)
+
+    if args.format == 'png':
+        files = emit_bitmaps_png(args.name, bitmaps)
+    else:
+        files = emit_bitmaps_header(args.name, bitmaps, font.layout,
+                args.font)
+    paths = write_files(files, args.outdir)
+    print('> {} bitmaps in {:.3f}s: {}'.format(len(bitmaps),
+            time.time() - start, paths[0] if len(paths) == 1
+            else '{} files in {}'.format(len(paths), args.outdir)))
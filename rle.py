@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+#
+import numpy as np
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Run-length encoding of cropped glyph bitmaps, see inc/lcd_font_rle.h for the
+# C decoder.
+#
+# The pixels of a glyph are read line by line, rows of the horizontal format
+# or columns of the vertical format, as one continuous stream, so the blank
+# margins at the end of a line and the start of the next one fall into a single
+# run. Every byte holds a run of blank pixels in the high nibble followed by a
+# run of set pixels in the low nibble:
+#
+#   0x35: 3 blank pixels, 5 set pixels
+#   0xf0: 15 blank pixels, the run of blank pixels goes on in the next byte
+#   0x0f: 15 set pixels, the run of set pixels goes on in the next byte
+#
+# The stream covers every pixel of the glyph, so the decoder never reads past
+# it and needs no terminator. Decoding takes one byte read per pair of runs
+# and no buffer beyond the current line.
+#
+RUN_MAX = 15
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Encode a flat pixel stream.
+#
+#   bits: 1-D array of 0 and 1, the glyph lines one after another
+#
+# Returns the encoded bytes.
+#
+def encode_rle(bits):
+    bits = np.asarray(bits, dtype=np.int8)
+    if len(bits) == 0:
+        return b''
+
+    # run lengths, alternating blank and set starting with blank
+    edges = np.flatnonzero(np.diff(bits)) + 1
+    runs = np.diff(np.concatenate(([0], edges, [len(bits)])))
+    if bits[0]:
+        runs = np.concatenate(([0], runs))
+    if len(runs) % 2:
+        runs = np.concatenate((runs, [0]))
+
+    out = bytearray()
+    for zeros, ones in zip(runs[0::2].tolist(), runs[1::2].tolist()):
+        while zeros > RUN_MAX:
+            out.append(RUN_MAX << 4)
+            zeros -= RUN_MAX
+        while ones > RUN_MAX:
+            out.append((zeros << 4) | RUN_MAX)
+            zeros = 0
+            ones -= RUN_MAX
+        out.append((zeros << 4) | ones)
+    return bytes(out)
+
+#
+# Decode into a flat pixel stream, the inverse of encode_rle().
+#
+#   data: encoded bytes
+#   count: number of pixels of the glyph
+#
+def decode_rle(data, count):
+    codes = np.frombuffer(data, dtype=np.uint8)
+    runs = np.empty(2 * len(codes), dtype=np.int64)
+    runs[0::2] = codes >> 4
+    runs[1::2] = codes & 0x0f
+    bits = np.repeat(np.tile(np.array([0, 1], dtype=np.uint8), len(codes)),
+            runs)
+    out = np.zeros(count, dtype=np.uint8)
+    out[:len(bits)] = bits
+    return out
+
+#
+# Decode line by line as the C decoder does, yielding one array of 'length'
+# pixels per line. This is the reference of lcd_rle_line().
+#
+#   data: encoded bytes
+#   length: number of pixels per line
+#   count: number of lines
+#
+def decode_rle_lines(data, length, count):
+    pos, zeros, ones = 0, 0, 0
+    for n in range(count):
+        line = np.zeros(length, dtype=np.uint8)
+        x = 0
+        while x < length:
+            if zeros == 0 and ones == 0:
+                if pos == len(data):
+                    break
+                zeros, ones = data[pos] >> 4, data[pos] & 0x0f
+                pos += 1
+            if zeros:
+                step = min(zeros, length - x)
+                zeros -= step
+            else:
+                step = min(ones, length - x)
+                line[x:x+step] = 1
+                ones -= step
+            x += step
+        yield line
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Encode the cropped bitmaps of a glyph set.
+#
+#   matrix: glyph pixels, see bitmap.glyph_matrix()
+#   metrics: width, height, xoffset and yoffset of the ink of every glyph, see
+#       bitmap.pack_compact()
+#   vertical: encode columns instead of rows
+#
+# Returns a list of bytes, one entry per glyph.
+#
+def encode_glyphs(matrix, metrics, vertical = False):
+    out = []
+    for idx, (w, h, x, y) in enumerate(metrics[:,:4].tolist()):
+        ink = matrix[idx, y:y+h, x:x+w]
+        out.append(encode_rle((ink.T if vertical else ink).ravel()))
+    return out
+
+#
+# Check that every glyph decodes back to its cropped bitmap. Returns the index
+# of the first glyph that does not, or -1.
+#
+def verify_glyphs(matrix, metrics, encoded, vertical = False):
+    for idx, (w, h, x, y) in enumerate(metrics[:,:4].tolist()):
+        ink = matrix[idx, y:y+h, x:x+w]
+        bits = (ink.T if vertical else ink).ravel()
+        if not np.array_equal(decode_rle(encoded[idx], w * h), bits):
+            return idx
+    return -1
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Size and decode cost of an encoded glyph set.
+#
+#   metrics: glyph metrics as for encode_glyphs()
+#   encoded: encoded bitmaps
+#   raw: cropped bitmaps the encoding replaces
+#
+# Returns a dict of the encoded and raw byte counts, the compression ratio and
+# the average number of byte reads and of pixels per glyph. The decoder reads
+# one byte per pair of runs against one byte per 8 pixels for raw bitmaps, so
+# the byte reads estimate the decode cost on a controller.
+#
+def rle_stats(metrics, encoded, raw):
+    n = max(len(encoded), 1)
+    size = sum(len(b) for b in encoded)
+    raw_size = sum(len(b) for b in raw)
+    pixels = int((metrics[:,0].astype(np.int64) * metrics[:,1]).sum())
+    return {
+        'size': size,
+        'raw_size': raw_size,
+        'ratio': float(raw_size) / size if size else 1.0,
+        'reads': float(size) / n,
+        'raw_reads': float(raw_size) / n,
+        'pixels': float(pixels) / n,
+    }
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -4,10 +4,47 @@
 DEFAULT_FONT_DIR = './fonts'
 DEFAULT_OUTPUT_DIR = './build'
 DEFAULT_OUTPUT_TYPE = 'vertical'
+DEFAULT_OUTPUT_FORMAT = 'header'
 DEFAULT_POINT_SIZE = 10
 DEFAULT_START_CHAR = 0x20
 DEFAULT_END_CHAR = 0x7e
 
+# rasterizer backend, see rasterizer.py
+DEFAULT_RASTERIZER = 'otf2bdf'
+
+# conversion cache; bump GENERATOR_VERSION in fontlib.py on format changes
+USE_CACHE = True
+DEFAULT_CACHE_DIR = './build/.cache'
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# number of parallel batch jobs, 0 for one per CPU
+DEFAULT_JOBS = 0
+
+# glyphs per C array, 0 for a single array, see lcd_font_chunked
+DEFAULT_SPLIT = 0
+
+# approximate memory ceiling of rendering and packing glyphs in bytes
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+
+# foreground and background of the rgb565 layout, see layout.py
+DEFAULT_FG_COLOR = 0xffff
+DEFAULT_BG_COLOR = 0x0000
+
+# index of the system fonts of the GUI, see fontindex.py
+DEFAULT_FONT_INDEX = './build/.fontindex.json'
+
+# packed fonts kept for the GUI preview, see preview.py
+DEFAULT_PREVIEW_CACHE = 16
+
+# incremental builds and watch mode, see manifest.py
+DEFAULT_MANIFEST_NAME = '.fontgen-manifest.json'
+DEFAULT_WATCH_INTERVAL = 0.2
+DEFAULT_WATCH_DELAY = 0.3
+
+# screen size of screen files that give none, see render.py
+DEFAULT_SCREEN_WIDTH = 128
+DEFAULT_SCREEN_HEIGHT = 64
+
 # verbose output
 DEBUG_OUT = False
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+#
+import json
+import os
+import re
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Character subsets from the strings a firmware actually displays.
+#
+# Source files are scanned by extension:
+#
+#   .c .h .cc .cpp .hpp .ino: string and character literals, comments and
+#       include lines skipped
+#   .po .pot: msgid and msgstr strings, the header entry skipped
+#   .json: every string value, keys are identifiers and skipped
+#   anything else: every character of the file
+#
+C_EXTENSIONS = ('.c', '.h', '.cc', '.cpp', '.cxx', '.hh', '.hpp', '.ino')
+PO_EXTENSIONS = ('.po', '.pot')
+JSON_EXTENSIONS = ('.json',)
+
+# comments and include lines, then string and character literals with an
+# optional prefix
+_C_TOKEN = re.compile(r'''
+    ^[ \t]*\#[ \t]*include[^\n]*
+  | //[^\n]*
+  | /\*.*?\*/
+  | (?:u8|u|U|L)?"((?:[^"\\\n]|\\.)*)"
+  | (?:u8|u|U|L)?'((?:[^'\\\n]|\\.)*)'
+''', re.DOTALL | re.MULTILINE | re.VERBOSE)
+
+_ESCAPE = re.compile(r'''
+    \\(?:x([0-9a-fA-F]+)
+  | u([0-9a-fA-F]{4})
+  | U([0-9a-fA-F]{8})
+  | ([0-7]{1,3})
+  | (.))
+''', re.DOTALL | re.VERBOSE)
+
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'a': '\a', 'b': '\b',
+        'f': '\f', 'v': '\v', 'e': '\x1b'}
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Resolve the escape sequences of C or gettext string literals and join them,
+# as adjacent literals are joined.
+#
+# Runs of \x and octal escapes up to 0xff are bytes, as compilers and gettext
+# take them, and decoded as UTF-8, so that "\xC3\x9F" is one character, even
+# when a wrapped string splits the run. Bytes that are not UTF-8 are taken as
+# Latin-1.
+#
+def unescape(*literals):
+    out = []
+    run = bytearray()
+    for text in literals:
+        pos = 0
+        for m in _ESCAPE.finditer(text):
+            if m.start() > pos or not _is_byte_escape(m):
+                _flush_bytes(run, out)
+            out.append(text[pos:m.start()])
+            pos = m.end()
+            hexa, u4, u8, octal, char = m.groups()
+            if _is_byte_escape(m):
+                run.append(int(hexa, 16) if hexa else int(octal, 8))
+            elif hexa or u4 or u8:
+                code = int(hexa or u4 or u8, 16)
+                out.append(chr(code) if code <= 0x10ffff else '')
+            elif octal:
+                out.append(chr(int(octal, 8)))
+            else:
+                out.append(_SIMPLE_ESCAPES.get(char, char))
+        if pos < len(text):
+            _flush_bytes(run, out)
+            out.append(text[pos:])
+    _flush_bytes(run, out)
+    return ''.join(out)
+
+# an escape of one byte, \x or octal up to 0xff
+def _is_byte_escape(m):
+    hexa, octal = m.group(1), m.group(4)
+    if hexa:
+        return int(hexa, 16) <= 0xff
+    return octal is not None and int(octal, 8) <= 0xff
+
+# append the pending bytes of unescape() as text and clear them
+def _flush_bytes(run, out):
+    if run:
+        text = run.decode('utf-8', 'surrogateescape')
+        out.append(''.join(chr(ord(c) - 0xdc00) if '\udc80' <= c <= '\udcff'
+                else c for c in text))
+        del run[:]
+
+#
+# Strings of C and C++ sources.
+#
+def scan_c(text):
+    strings = []
+    for m in _C_TOKEN.finditer(text):
+        literal = m.group(1) if m.group(1) is not None else m.group(2)
+        if literal is not None:
+            strings.append(unescape(literal))
+    return strings
+
+#
+# Strings of a gettext catalog, both the original and the translations, as
+# untranslated messages fall back to the original. Strings wrapped over
+# several lines are joined, and the header entry, whose msgid is empty even
+# when it is wrapped too, is skipped.
+#
+def scan_po(text):
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#') or not line:
+            continue
+        keyword, _, rest = line.partition(' ')
+        if line.startswith('"'):
+            # continuation of a wrapped string, as msgmerge writes long ones
+            if entries:
+                entries[-1][1].append(line.strip()[1:-1])
+        elif rest.startswith('"'):
+            entries.append((keyword, [rest.strip()[1:-1]]))
+
+    strings = []
+    header = False
+    for keyword, parts in entries:
+        value = unescape(*parts)
+        if keyword == 'msgid':
+            header = value == ''
+        if keyword == 'msgctxt' or (header and keyword.startswith('msgstr')):
+            # the msgstr of the header entry holds the catalog metadata
+            continue
+        strings.append(value)
+    return strings
+
+#
+# String values of a JSON document.
+#
+def scan_json(text):
+    strings = []
+    stack = [json.loads(text)]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return strings
+
+#
+# Strings of a file, chosen by its extension.
+#
+def scan_file(fname):
+    with open(fname, 'r', encoding='utf-8') as f:
+        text = f.read()
+    ext = os.path.splitext(fname)[1].lower()
+    if ext in C_EXTENSIONS:
+        return scan_c(text)
+    if ext in PO_EXTENSIONS:
+        return scan_po(text)
+    if ext in JSON_EXTENSIONS:
+        return scan_json(text)
+    return [text]
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Character codes used by a set of files and an explicit character list.
+#
+#   fnames: source, catalog or text files, see scan_file()
+#   chars: characters to add, as a string
+#
+# Returns a sorted tuple of the printable character codes, control characters
+# are left out.
+#
+def collect_codes(fnames = (), chars = ''):
+    used = set(chars)
+    for fname in fnames:
+        for text in scan_file(fname):
+            used.update(text)
+    return tuple(sorted(code for code in map(ord, used)
+            if code >= 0x20 and not 0x7f <= code <= 0x9f))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+#
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import make_bdf
+from emit import emit_header, write_files
+from fontlib import load_font, pack_font
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Generated headers compile, whatever the characters of the range endpoints.
+#
+@unittest.skipIf(shutil.which('gcc') is None, 'gcc is not installed')
+class HeaderCompileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bdf = os.path.join(self.tmpdir, 'font.bdf')
+        with open(self.bdf, 'w') as f:
+            f.write(make_bdf(0x100 - 0x20, 0x20, 8, 12))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    # compile the headers of a range and check the endpoints of the struct
+    def check(self, chars, first, last):
+        glyphs = load_font(self.bdf, 12, chars, backend='bdf',
+                use_cache=False)
+        for ftype in ('horizontal', 'vertical'):
+            files = emit_header(pack_font(glyphs, ftype))
+            write_files(files, self.tmpdir)
+            name = list(files)[0]
+            font = os.path.splitext(name)[0]
+            src = os.path.join(self.tmpdir, 'main.c')
+            with open(src, 'w') as f:
+                f.write('#include <stdint.h>\n'
+                        '#include "{}"\n'
+                        'int main(void)\n'
+                        '{{\n'
+                        '\treturn !({}.startcode == {} && {}.endcode == {});\n'
+                        '}}\n'.format(name, font, first, font, last))
+            exe = os.path.join(self.tmpdir, 'main')
+            subprocess.check_call(['gcc', '-Wall', '-Werror',
+                    '-I', os.path.join(ROOT, 'inc'), '-I', self.tmpdir,
+                    '-o', exe, src])
+            subprocess.check_call([exe])
+
+    def test_quote_and_backslash(self):
+        self.check('0x27-0x5c', 0x27, 0x5c)
+
+    def test_latin1(self):
+        self.check('0x20-0xff', 0x20, 0xff)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+#
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subset import scan_c, scan_po, unescape
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Escape sequences of the strings collected for --subset.
+#
+class UnescapeTest(unittest.TestCase):
+
+    def test_utf8_bytes(self):
+        self.assertEqual(unescape(r'Stra\xC3\x9F'), 'Straß')
+        self.assertEqual(unescape(r'\303\237\xe2\x82\xac'), 'ß€')
+
+    def test_latin1_bytes(self):
+        self.assertEqual(unescape(r'\xE9t\xE9'), 'été')
+        self.assertEqual(unescape(r'\xC3\x9F\xFF'), 'ß\xff')
+
+    def test_code_points(self):
+        self.assertEqual(unescape(r'\u00df\U0001F600\x20AC'), 'ß\U0001F600€')
+        self.assertEqual(unescape(r'a\tb\\n'), 'a\tb\\n')
+
+    def test_c_source(self):
+        self.assertEqual(scan_c('const char *s = "Gr\\xC3\\xBC\\xC3\\x9F";'),
+                ['Grüß'])
+
+    def test_wrapped_po(self):
+        po = ('msgid ""\n'
+              'msgstr "Content-Type: text/plain; charset=UTF-8\\n"\n'
+              '\n'
+              'msgid "Stra\\xC3"\n'
+              '"\\x9F"\n'
+              '"e"\n'
+              'msgstr "\\303\\237"\n')
+        self.assertEqual(scan_po(po), ['', 'Straße', 'ß'])
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import os
+import threading
+from settings import *
+from fontlib import Cancelled
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+#
+# Conversions in the background, for the GUI.
+#
+# Jobs run generate_font_file() on a pool of threads so that the caller stays
+# responsive. otf2bdf runs in a process of its own and numpy releases the GIL
+# while packing, so queued jobs also run concurrently.
+#
+#   workers: number of threads, 0 or None for one per CPU
+#   notify: notify(func, *args) runs func(*args) on the thread of the caller,
+#       e.g. wx.CallAfter. By default callbacks run on the worker threads.
+#
+# A job is cancelled between two glyph chunks, or before it starts; a running
+# rasterizer is not interrupted.
+#
+class JobQueue(object):
+
+    def __init__(self, workers = DEFAULT_JOBS, notify = None):
+        self.pool = ThreadPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1)
+        self.notify = notify or (lambda func, *args: func(*args))
+        self.ids = itertools.count(1)
+        self.events = {}
+        self.lock = threading.Lock()
+
+    #
+    # Queue a conversion.
+    #
+    #   fname: source font file
+    #   on_progress: on_progress(ident, done, total) with the number of glyphs
+    #       packed, see generate_font_file()
+    #   on_done: on_done(ident, output, error) with the generated file path or
+    #       None, and None or the failure, 'cancelled' for cancelled jobs
+    #   options: other arguments of generate_font_file()
+    #
+    # Returns the job id.
+    #
+    def submit(self, fname, on_progress = None, on_done = None, **options):
+        ident = next(self.ids)
+        event = threading.Event()
+        with self.lock:
+            self.events[ident] = event
+        self.pool.submit(self._run, ident, event, fname, on_progress,
+                on_done, options)
+        return ident
+
+    # cancel a job, or every queued and running job
+    def cancel(self, ident = None):
+        with self.lock:
+            if ident is None:
+                events = list(self.events.values())
+            else:
+                events = [self.events[ident]] if ident in self.events else []
+        for event in events:
+            event.set()
+
+    # number of queued and running jobs
+    def pending(self):
+        with self.lock:
+            return len(self.events)
+
+    def shutdown(self, cancel = True):
+        if cancel:
+            self.cancel()
+        self.pool.shutdown(wait=False)
+
+    def _run(self, ident, event, fname, on_progress, on_done, options):
+        # imported here since fontgen is usually the main module
+        from fontgen import generate_font_file
+
+        def progress(done, total):
+            if event.is_set():
+                raise Cancelled('cancelled')
+            if on_progress is not None:
+                self.notify(on_progress, ident, done, total)
+
+        output = error = None
+        try:
+            if not event.is_set():
+                output = generate_font_file(fname, progress = progress,
+                        **options) or None
+            if output is None:
+                error = 'cancelled' if event.is_set() else 'conversion failed'
+        except Exception as e:
+            error = '{}: {}'.format(type(e).__name__, e)
+        finally:
+            with self.lock:
+                del self.events[ident]
+        if on_done is not None:
+            self.notify(on_done, ident, output, error)
+
+#--------1---------2---------3---------4---------5---------6---------7---------8
+if __name__ == '__main__':
+    print('')
+    print('> This is not the main program.')
+    print('> Run fontgen.py instead.')
+    print('')